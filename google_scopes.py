@@ -2,7 +2,8 @@
 Google API scopes used by Luna.
 
 This is the single source of truth for OAuth scopes.
-Both the main bot and MCP calendar server import from here.
+The main bot and the auth script import from here; the MCP servers run
+in their own environments and keep an inlined copy that must match.
 """
 
 GOOGLE_SCOPES = [
@@ -5,58 +5,148 @@ Provides tools to read calendar events via the Model Context Protocol.
 """
 
 import asyncio
+import heapq
+import logging
 import os
-from datetime import datetime, timedelta
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
 from zoneinfo import ZoneInfo
 
+import httplib2
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from google_auth_httplib2 import AuthorizedHttp
 
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent
 
-# Import shared scopes from project root
-import sys
-sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
-from google_scopes import GOOGLE_SCOPES
-
 # Configuration
 CREDENTIALS_PATH = Path(os.getenv("GOOGLE_CREDENTIALS_PATH", "credentials.json"))
 TOKEN_PATH = Path(os.getenv("GOOGLE_TOKEN_PATH", "token.json"))
-SCOPES = GOOGLE_SCOPES
+# Must match GOOGLE_SCOPES in google_scopes.py - inlined so the server
+# does not need the project root on sys.path
+SCOPES = [
+    "https://www.googleapis.com/auth/calendar",
+    "https://www.googleapis.com/auth/contacts.readonly",
+]
 TIMEZONE = ZoneInfo(os.getenv("CALENDAR_TIMEZONE", "Europe/Vienna"))
+TIMEZONE_NAME = str(TIMEZONE)
+MAX_CONCURRENT_REQUESTS = 10
+MAX_BATCH_SIZE = 50
+
+# Users rarely add calendars, so the calendar list is reused for a while
+CALENDAR_LIST_TTL = 600
+EVENTS_CACHE_TTL = 60
+HTTP_TIMEOUT = 30
+
+# Partial-response mask: only request the fields format_event() uses
+EVENT_FIELDS = "items(summary,start)"
+# Default cap on events listed by get_upcoming_events / get_events_for_date
+DEFAULT_MAX_RESULTS = 20
+# Upper bound for max_results, matching the API's own maxResults limit
+MAX_RESULTS_LIMIT = 250
 
 server = Server("google-calendar")
+# stdout carries the MCP protocol, so logs go to stderr (see main())
+logger = logging.getLogger("google-calendar")
+
+# Refresh tokens a little before they expire instead of on the first failure
+REFRESH_MARGIN = timedelta(minutes=5)
+
+# Cached across tool calls - the server process is long-lived
+_creds: Credentials | None = None
+_calendar_service = None
+_calendar_ids: list[str] | None = None
+_calendar_ids_fetched_at = 0.0
+# {(start_iso, end_iso): (fetched_at, events)}
+_events_cache: dict[tuple[str, str], tuple[float, list[dict]]] = {}
+# Per-thread reusable HTTP transports for batch requests
+_thread_local = threading.local()
+
+
+def credentials_need_refresh(creds: Credentials) -> bool:
+    """Check if credentials are invalid or expire within REFRESH_MARGIN."""
+    if not creds.valid:
+        return True
+    # google-auth stores expiry as naive UTC
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return creds.expiry is not None and creds.expiry - REFRESH_MARGIN <= now
 
 
 def get_google_credentials() -> Credentials:
     """Get or refresh Google API credentials."""
-    creds = None
+    global _creds
+
+    if _creds and not credentials_need_refresh(_creds):
+        return _creds
 
-    if TOKEN_PATH.exists():
+    creds = _creds
+    if not creds and TOKEN_PATH.exists():
         creds = Credentials.from_authorized_user_file(str(TOKEN_PATH), SCOPES)
 
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
+    # Only write token.json back if the credentials actually changed
+    creds_dirty = False
+    if not creds or credentials_need_refresh(creds):
+        if creds and creds.refresh_token:
             creds.refresh(Request())
         else:
             flow = InstalledAppFlow.from_client_secrets_file(str(CREDENTIALS_PATH), SCOPES)
             creds = flow.run_local_server(port=0)
+        creds_dirty = True
 
+    if creds_dirty:
         with open(TOKEN_PATH, "w") as token:
             token.write(creds.to_json())
 
+    _creds = creds
     return creds
 
 
 def get_calendar_service():
     """Get Google Calendar API service."""
+    global _calendar_service
+
+    # Refreshes the shared credentials in place if they expired
     creds = get_google_credentials()
-    return build("calendar", "v3", credentials=creds)
+    if _calendar_service is None:
+        _calendar_service = build(
+            "calendar", "v3", credentials=creds, cache_discovery=False, static_discovery=True
+        )
+    return _calendar_service
+
+
+def invalidate_google_service(error: Exception) -> None:
+    """Drop cached credentials and service if Google rejected them."""
+    global _creds, _calendar_service
+
+    if isinstance(error, HttpError) and error.resp.status == 401:
+        _creds = None
+        _calendar_service = None
+
+
+def start_of_local_day(day: date) -> datetime:
+    """Midnight of the given day in TIMEZONE."""
+    return datetime.combine(day, datetime.min.time(), tzinfo=TIMEZONE)
+
+
+def local_datetime_str(start: str) -> str:
+    """Return the 'YYYY-MM-DDTHH:MM' prefix of an event dateTime in local time.
+
+    Events are requested with timeZone=TIMEZONE, so Google already returns
+    local offsets and the prefix can be sliced directly; only UTC 'Z'
+    timestamps still need a conversion.
+    """
+    if start.endswith("Z"):
+        dt = datetime.fromisoformat(start.replace("Z", "+00:00"))
+        return dt.astimezone(TIMEZONE).isoformat()[:16]
+    return start[:16]
 
 
 def format_event(event: dict) -> str:
@@ -65,10 +155,8 @@ def format_event(event: dict) -> str:
     summary = event.get("summary", "Kein Titel")
 
     if "T" in start:
-        # Parse and convert to local timezone
-        dt = datetime.fromisoformat(start.replace("Z", "+00:00"))
-        dt_local = dt.astimezone(TIMEZONE)
-        return f"{dt_local.strftime('%H:%M')} - {summary}"
+        local = local_datetime_str(start)
+        return f"{local[11:16]} - {summary}"
     else:
         return f"Ganztägig - {summary}"
 
@@ -79,57 +167,167 @@ def format_event_with_date(event: dict) -> str:
     summary = event.get("summary", "Kein Titel")
 
     if "T" in start:
-        dt = datetime.fromisoformat(start.replace("Z", "+00:00"))
-        dt_local = dt.astimezone(TIMEZONE)
-        return f"{dt_local.strftime('%d.%m %H:%M')} - {summary}"
+        local = local_datetime_str(start)
+        return f"{local[8:10]}.{local[5:7]} {local[11:16]} - {summary}"
     else:
-        # All-day event - just show date
-        date = datetime.strptime(start, "%Y-%m-%d")
-        return f"{date.strftime('%d.%m')} Ganztägig - {summary}"
+        # All-day event - just show date (YYYY-MM-DD)
+        return f"{start[8:10]}.{start[5:7]} Ganztägig - {summary}"
 
 
-def get_events_for_range(start_time: datetime, end_time: datetime) -> list[dict]:
-    """Get calendar events for a specific time range from all calendars."""
-    service = get_calendar_service()
+def get_authorized_http(creds: Credentials) -> AuthorizedHttp:
+    """Get this thread's authorized HTTP transport, keeping its connections alive.
 
-    # Ensure times have timezone info
-    if start_time.tzinfo is None:
-        start_time = start_time.replace(tzinfo=TIMEZONE)
-    if end_time.tzinfo is None:
-        end_time = end_time.replace(tzinfo=TIMEZONE)
+    httplib2 is not thread-safe, so each worker thread gets its own transport
+    instead of a fresh one (and a fresh TLS handshake) per request.
+    """
+    http = getattr(_thread_local, "http", None)
+    if http is None or http.credentials is not creds:
+        http = AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+        _thread_local.http = http
+    return http
 
-    # Get all calendars
-    calendars = service.calendarList().list().execute()
-    all_events = []
 
-    for cal in calendars.get("items", []):
-        cal_id = cal["id"]
+def execute_request(request, creds: Credentials):
+    """Execute a single API request on this thread's own HTTP transport (blocking)."""
+    return request.execute(http=get_authorized_http(creds))
 
-        # Skip holiday calendars
-        if "holiday@group" in cal_id:
-            continue
 
-        try:
-            events_result = service.events().list(
+def event_start_key(event: dict) -> str:
+    """Sort key for events: the start dateTime, or the date for all-day events."""
+    start = event["start"]
+    return start.get("dateTime") or start.get("date", "")
+
+
+def fetch_calendar_events(service, creds: Credentials, cal_ids: list[str], start_time: datetime, end_time: datetime) -> list[list[dict]]:
+    """Fetch events of several calendars with a single batch HTTP request (blocking).
+
+    Returns one list per calendar, each already sorted by start time.
+    """
+    events_per_calendar = []
+
+    def collect(request_id, response, exception):
+        if exception is not None:
+            # Skip calendars we can't access
+            logger.warning("Failed to fetch calendar %s: %s", cal_ids[int(request_id)], exception)
+            return
+        events_per_calendar.append(response.get("items", []))
+
+    batch = service.new_batch_http_request(callback=collect)
+    for i, cal_id in enumerate(cal_ids):
+        batch.add(
+            service.events().list(
                 calendarId=cal_id,
                 timeMin=start_time.isoformat(),
                 timeMax=end_time.isoformat(),
                 singleEvents=True,
                 orderBy="startTime",
-                timeZone=str(TIMEZONE)
-            ).execute()
+                timeZone=TIMEZONE_NAME,
+                fields=EVENT_FIELDS
+            ),
+            request_id=str(i)
+        )
+    batch.execute(http=get_authorized_http(creds))
 
-            all_events.extend(events_result.get("items", []))
-        except Exception:
-            # Skip calendars we can't access
-            continue
+    return events_per_calendar
+
+
+async def get_calendar_ids(service, creds: Credentials) -> list[str]:
+    """Get the IDs of all readable, visible calendars (cached for CALENDAR_LIST_TTL)."""
+    global _calendar_ids, _calendar_ids_fetched_at
 
-    # Sort all events by start time
-    all_events.sort(key=lambda e: e["start"].get("dateTime", e["start"].get("date", "")))
+    if _calendar_ids is not None and time.monotonic() - _calendar_ids_fetched_at < CALENDAR_LIST_TTL:
+        return _calendar_ids
+
+    # Let the API drop hidden and free/busy-only calendars
+    calendars = await asyncio.to_thread(
+        execute_request,
+        service.calendarList().list(minAccessRole="reader", showHidden=False, fields="items(id)"),
+        creds
+    )
+
+    # Skip holiday calendars
+    _calendar_ids = [cal["id"] for cal in calendars.get("items", []) if "holiday@group" not in cal["id"]]
+    _calendar_ids_fetched_at = time.monotonic()
+    return _calendar_ids
+
+
+async def get_events_for_range(start_time: datetime, end_time: datetime) -> list[dict]:
+    """Get calendar events for a specific time range from all calendars."""
+    # Ensure times have timezone info
+    if start_time.tzinfo is None:
+        start_time = start_time.replace(tzinfo=TIMEZONE)
+    if end_time.tzinfo is None:
+        end_time = end_time.replace(tzinfo=TIMEZONE)
 
+    # The LLM often asks for the same window several times in one turn
+    cache_key = (start_time.isoformat(), end_time.isoformat())
+    cached = _events_cache.get(cache_key)
+    if cached and time.monotonic() - cached[0] < EVENTS_CACHE_TTL:
+        return cached[1]
+
+    # May refresh the token over the network
+    service = await asyncio.to_thread(get_calendar_service)
+    creds = await asyncio.to_thread(get_google_credentials)
+
+    cal_ids = await get_calendar_ids(service, creds)
+
+    # Google allows at most 50 requests per batch; run the batches concurrently,
+    # bounded to respect Google's per-user QPS
+    chunks = [cal_ids[i:i + MAX_BATCH_SIZE] for i in range(0, len(cal_ids), MAX_BATCH_SIZE)]
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+    async def fetch(chunk: list[str]) -> list[list[dict]]:
+        async with semaphore:
+            return await asyncio.to_thread(
+                fetch_calendar_events, service, creds, chunk, start_time, end_time
+            )
+
+    results = await asyncio.gather(*(fetch(chunk) for chunk in chunks), return_exceptions=True)
+
+    per_calendar = []
+    complete = True
+    for chunk, result in zip(chunks, results):
+        # Skip batches that failed as a whole
+        if isinstance(result, BaseException):
+            invalidate_google_service(result)
+            complete = False
+            continue
+        # Calendars that failed inside the batch are missing from the result
+        if len(result) < len(chunk):
+            complete = False
+        per_calendar.extend(result)
+
+    # Each calendar is already ordered by startTime - k-way merge instead of a full sort
+    all_events = list(heapq.merge(*per_calendar, key=event_start_key))
+
+    # Don't let a transient Google error stick around as missing events
+    if complete:
+        now = time.monotonic()
+        # Keys include the current minute, so drop expired windows on the way
+        for key in [k for k, (fetched_at, _) in _events_cache.items() if now - fetched_at >= EVENTS_CACHE_TTL]:
+            del _events_cache[key]
+        _events_cache[cache_key] = (now, all_events)
     return all_events
 
 
+def format_event_list(events: list[dict], formatter, max_results) -> list[str]:
+    """Format at most max_results events, noting how many were left out.
+
+    max_results comes straight from the tool arguments, so it is coerced to
+    an int and clamped to 1..MAX_RESULTS_LIMIT.
+    """
+    try:
+        max_results = int(max_results)
+    except (TypeError, ValueError):
+        max_results = DEFAULT_MAX_RESULTS
+    max_results = min(max(max_results, 1), MAX_RESULTS_LIMIT)
+
+    formatted = [formatter(e) for e in events[:max_results]]
+    if len(events) > max_results:
+        formatted.append(f"... und {len(events) - max_results} weitere")
+    return formatted
+
+
 @server.list_tools()
 async def list_tools() -> list[Tool]:
     """List available calendar tools."""
@@ -162,6 +360,13 @@ async def list_tools() -> list[Tool]:
                         "type": "integer",
                         "description": "Anzahl der Tage in die Zukunft (Standard: 7)",
                         "default": 7
+                    },
+                    "max_results": {
+                        "type": "integer",
+                        "description": f"Maximale Anzahl Termine (Standard: {DEFAULT_MAX_RESULTS})",
+                        "default": DEFAULT_MAX_RESULTS,
+                        "minimum": 1,
+                        "maximum": MAX_RESULTS_LIMIT
                     }
                 },
                 "required": []
@@ -176,6 +381,13 @@ async def list_tools() -> list[Tool]:
                     "date": {
                         "type": "string",
                         "description": "Datum im Format YYYY-MM-DD"
+                    },
+                    "max_results": {
+                        "type": "integer",
+                        "description": f"Maximale Anzahl Termine (Standard: {DEFAULT_MAX_RESULTS})",
+                        "default": DEFAULT_MAX_RESULTS,
+                        "minimum": 1,
+                        "maximum": MAX_RESULTS_LIMIT
                     }
                 },
                 "required": ["date"]
@@ -223,11 +435,10 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
     """Handle tool calls."""
 
     if name == "get_events_today":
-        now = datetime.now(TIMEZONE)
-        start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        start_of_day = start_of_local_day(datetime.now(TIMEZONE).date())
         end_of_day = start_of_day + timedelta(days=1)
 
-        events = get_events_for_range(start_of_day, end_of_day)
+        events = await get_events_for_range(start_of_day, end_of_day)
         formatted = [format_event(e) for e in events]
 
         if formatted:
@@ -238,12 +449,11 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         return [TextContent(type="text", text=result)]
 
     elif name == "get_events_tomorrow":
-        now = datetime.now(TIMEZONE)
-        tomorrow = now + timedelta(days=1)
-        start_of_day = tomorrow.replace(hour=0, minute=0, second=0, microsecond=0)
+        tomorrow = datetime.now(TIMEZONE).date() + timedelta(days=1)
+        start_of_day = start_of_local_day(tomorrow)
         end_of_day = start_of_day + timedelta(days=1)
 
-        events = get_events_for_range(start_of_day, end_of_day)
+        events = await get_events_for_range(start_of_day, end_of_day)
         formatted = [format_event(e) for e in events]
 
         if formatted:
@@ -255,11 +465,14 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
 
     elif name == "get_upcoming_events":
         days = arguments.get("days", 7)
-        now = datetime.now(TIMEZONE)
+        # Truncate to the minute so repeated calls share a cache entry
+        now = datetime.now(TIMEZONE).replace(second=0, microsecond=0)
         end_date = now + timedelta(days=days)
 
-        events = get_events_for_range(now, end_date)
-        formatted = [format_event_with_date(e) for e in events]
+        events = await get_events_for_range(now, end_date)
+        formatted = format_event_list(
+            events, format_event_with_date, arguments.get("max_results", DEFAULT_MAX_RESULTS)
+        )
 
         if formatted:
             result = f"Termine der nächsten {days} Tage:\n" + "\n".join(f"• {e}" for e in formatted)
@@ -271,16 +484,17 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
     elif name == "get_events_for_date":
         date_str = arguments.get("date")
         try:
-            target_date = datetime.strptime(date_str, "%Y-%m-%d")
-            target_date = target_date.replace(tzinfo=TIMEZONE)
+            target_date = datetime.strptime(date_str, "%Y-%m-%d").date()
         except ValueError:
             return [TextContent(type="text", text=f"Ungültiges Datumsformat: {date_str}. Bitte YYYY-MM-DD verwenden.")]
 
-        start_of_day = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        start_of_day = start_of_local_day(target_date)
         end_of_day = start_of_day + timedelta(days=1)
 
-        events = get_events_for_range(start_of_day, end_of_day)
-        formatted = [format_event(e) for e in events]
+        events = await get_events_for_range(start_of_day, end_of_day)
+        formatted = format_event_list(
+            events, format_event, arguments.get("max_results", DEFAULT_MAX_RESULTS)
+        )
 
         date_display = target_date.strftime("%d.%m.%Y")
         if formatted:
@@ -322,8 +536,8 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
 
                 event_body = {
                     "summary": title,
-                    "start": {"dateTime": start_dt.isoformat(), "timeZone": str(TIMEZONE)},
-                    "end": {"dateTime": end_dt.isoformat(), "timeZone": str(TIMEZONE)},
+                    "start": {"dateTime": start_dt.isoformat(), "timeZone": TIMEZONE_NAME},
+                    "end": {"dateTime": end_dt.isoformat(), "timeZone": TIMEZONE_NAME},
                 }
 
             if description:
@@ -331,8 +545,12 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
             if location:
                 event_body["location"] = location
 
-            service = get_calendar_service()
-            service.events().insert(calendarId="primary", body=event_body).execute()
+            service = await asyncio.to_thread(get_calendar_service)
+            creds = await asyncio.to_thread(get_google_credentials)
+            await asyncio.to_thread(
+                execute_request, service.events().insert(calendarId="primary", body=event_body), creds
+            )
+            _events_cache.clear()
 
             if all_day:
                 result = f"✅ Ganztägiger Termin erstellt: {title} am {start_date.strftime('%d.%m.%Y')}"
@@ -344,6 +562,7 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         except ValueError as e:
             return [TextContent(type="text", text=f"Ungültiges Datumsformat. Bitte YYYY-MM-DDTHH:MM verwenden. Fehler: {str(e)}")]
         except Exception as e:
+            invalidate_google_service(e)
             return [TextContent(type="text", text=f"Fehler beim Erstellen des Termins: {str(e)}")]
 
     else:
@@ -362,6 +581,11 @@ async def run_server():
 
 def main():
     """Entry point for the MCP server."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
+        stream=sys.stderr
+    )
     asyncio.run(run_server())
 
 
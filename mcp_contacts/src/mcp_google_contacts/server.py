@@ -9,75 +9,205 @@ import asyncio
 import json
 import os
 import sqlite3
-from datetime import datetime
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
+import httplib2
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from google_auth_httplib2 import AuthorizedHttp
 
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent
 
-# Import shared scopes from project root
-import sys
-sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent))
-from google_scopes import GOOGLE_SCOPES
-
 # Configuration
 CREDENTIALS_PATH = Path(os.getenv("GOOGLE_CREDENTIALS_PATH", "credentials.json"))
 TOKEN_PATH = Path(os.getenv("GOOGLE_TOKEN_PATH", "token.json"))
 DB_PATH = Path(os.getenv("LUNA_DB_PATH", Path(__file__).parent.parent.parent.parent / "data" / "luna.db"))
-SCOPES = GOOGLE_SCOPES
+# Must match GOOGLE_SCOPES in google_scopes.py - inlined so the server
+# does not need the project root on sys.path
+SCOPES = [
+    "https://www.googleapis.com/auth/calendar",
+    "https://www.googleapis.com/auth/contacts.readonly",
+]
+
+# Partial-response mask: skip photos and metadata we never use
+CONNECTION_FIELDS = (
+    "connections(resourceName,metadata/deleted,names/displayName,emailAddresses/value,"
+    "phoneNumbers/value,organizations/name),nextPageToken,nextSyncToken"
+)
+
+# sync_state key under which the People API sync token is stored
+CONTACTS_SYNC_TOKEN_KEY = "contacts_sync_token"
+
+HTTP_TIMEOUT = 30
 
 server = Server("google-contacts")
 
+# Columns selected as "col [JSON]" are decoded by the sqlite3 module itself
+sqlite3.register_converter("JSON", json.loads)
+
+# Refresh tokens a little before they expire instead of on the first failure
+REFRESH_MARGIN = timedelta(minutes=5)
+
+# Cached across tool calls - the server process is long-lived
+_creds: Credentials | None = None
+_people_service = None
+_write_lock = threading.Lock()
+# Per-thread HTTP transports and DB connections, see get_authorized_http()
+# and get_db_connection()
+_thread_local = threading.local()
+
+
+def credentials_need_refresh(creds: Credentials) -> bool:
+    """Check if credentials are invalid or expire within REFRESH_MARGIN."""
+    if not creds.valid:
+        return True
+    # google-auth stores expiry as naive UTC
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return creds.expiry is not None and creds.expiry - REFRESH_MARGIN <= now
+
 
 def get_google_credentials() -> Credentials:
     """Get or refresh Google API credentials."""
-    creds = None
+    global _creds
 
-    if TOKEN_PATH.exists():
+    if _creds and not credentials_need_refresh(_creds):
+        return _creds
+
+    creds = _creds
+    if not creds and TOKEN_PATH.exists():
         creds = Credentials.from_authorized_user_file(str(TOKEN_PATH), SCOPES)
 
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
+    # Only write token.json back if the credentials actually changed
+    creds_dirty = False
+    if not creds or credentials_need_refresh(creds):
+        if creds and creds.refresh_token:
             creds.refresh(Request())
         else:
             flow = InstalledAppFlow.from_client_secrets_file(str(CREDENTIALS_PATH), SCOPES)
             creds = flow.run_local_server(port=0)
+        creds_dirty = True
 
+    if creds_dirty:
         with open(TOKEN_PATH, "w") as token:
             token.write(creds.to_json())
 
+    _creds = creds
     return creds
 
 
 def get_people_service():
     """Get Google People API service."""
-    creds = get_google_credentials()
-    return build("people", "v1", credentials=creds)
+    global _people_service
 
+    # Refreshes the shared credentials in place if they expired
+    creds = get_google_credentials()
+    if _people_service is None:
+        _people_service = build(
+            "people", "v1", credentials=creds, cache_discovery=False, static_discovery=True
+        )
+    return _people_service
+
+
+def get_authorized_http(creds: Credentials) -> AuthorizedHttp:
+    """Get this thread's authorized HTTP transport.
+
+    httplib2 is not thread-safe, so requests run from worker threads must not
+    share the cached service's built-in transport.
+    """
+    http = getattr(_thread_local, "http", None)
+    if http is None or http.credentials is not creds:
+        http = AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+        _thread_local.http = http
+    return http
+
+
+def invalidate_google_service(error: Exception) -> None:
+    """Drop cached credentials and service if Google rejected them."""
+    global _creds, _people_service
+
+    if isinstance(error, HttpError) and error.resp.status == 401:
+        _creds = None
+        _people_service = None
+
+
+def get_db_connection() -> sqlite3.Connection:
+    """Get this thread's SQLite database connection (opened on first use).
+
+    Tool calls run in worker threads; a connection per thread keeps a read
+    in one thread from stepping on a transaction open in another.
+    """
+    conn = getattr(_thread_local, "conn", None)
+    if conn is None:
+        # Autocommit mode - write paths open their own transactions
+        conn = sqlite3.connect(DB_PATH, isolation_level=None, detect_types=sqlite3.PARSE_COLNAMES)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+        conn.execute("PRAGMA cache_size=-20000")
+        _thread_local.conn = conn
+    return conn
+
+
+@contextmanager
+def write_transaction():
+    """Run the enclosed statements in a single write transaction."""
+    # Serialize writers here rather than spinning on SQLite's busy timeout
+    with _write_lock:
+        conn = get_db_connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
 
-def get_db_connection():
-    """Get SQLite database connection."""
-    return sqlite3.connect(DB_PATH)
 
+def fetch_google_contacts(sync_token: str | None = None) -> tuple[list[dict], set[str], str | None]:
+    """Fetch contacts from Google People API.
 
-def fetch_google_contacts() -> list[dict]:
-    """Fetch all contacts from Google People API."""
+    Without a sync token all contacts are fetched; with one only contacts
+    changed since that token. Returns (contacts, deleted google IDs, next sync token).
+    """
     service = get_people_service()
-
-    results = service.people().connections().list(
-        resourceName="people/me",
-        pageSize=1000,
-        personFields="names,emailAddresses,phoneNumbers,organizations"
-    ).execute()
+    http = get_authorized_http(get_google_credentials())
+
+    connections = []
+    page_token = None
+    while True:
+        results = service.people().connections().list(
+            resourceName="people/me",
+            pageSize=1000,
+            personFields="names,emailAddresses,phoneNumbers,organizations",
+            fields=CONNECTION_FIELDS,
+            pageToken=page_token,
+            requestSyncToken=True,
+            syncToken=sync_token
+        ).execute(http=http)
+
+        connections.extend(results.get("connections", []))
+        page_token = results.get("nextPageToken")
+        if not page_token:
+            break
 
     contacts = []
-    for person in results.get("connections", []):
+    deleted_ids = set()
+    for person in connections:
+        if person.get("metadata", {}).get("deleted"):
+            deleted_ids.add(person.get("resourceName", ""))
+            continue
+
         names = person.get("names", [])
         emails = person.get("emailAddresses", [])
         phones = person.get("phoneNumbers", [])
@@ -95,63 +225,109 @@ def fetch_google_contacts() -> list[dict]:
             "organization": orgs[0].get("name", "") if orgs else ""
         })
 
-    return contacts
+    return contacts, deleted_ids, results.get("nextSyncToken")
+
+
+def get_sync_token(key: str) -> str | None:
+    """Get a stored Google sync token."""
+    row = get_db_connection().execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+    return row["value"] if row else None
+
+
+def is_expired_sync_token(error: HttpError) -> bool:
+    """Check if a People API error means the sync token has expired.
+
+    The API reports it as 400 FAILED_PRECONDITION with reason
+    EXPIRED_SYNC_TOKEN; 410 Gone is accepted too.
+    """
+    if error.resp.status == 410:
+        return True
+    return error.resp.status == 400 and b"EXPIRED_SYNC_TOKEN" in (error.content or b"")
 
 
 def sync_contacts_to_db() -> dict:
-    """Sync contacts from Google to local database. Returns sync stats."""
-    google_contacts = fetch_google_contacts()
+    """Sync contacts from Google to local database. Returns sync stats.
+
+    Uses the stored sync token to only fetch changes; falls back to a full
+    sync if there is none or Google expired it.
+    """
+    sync_token = get_sync_token(CONTACTS_SYNC_TOKEN_KEY)
+    try:
+        google_contacts, deleted_ids, next_sync_token = fetch_google_contacts(sync_token)
+    except HttpError as e:
+        # Sync tokens expire after 7 days - drop it and do a full sync
+        if sync_token is None or not is_expired_sync_token(e):
+            raise
+        sync_token = None
+        google_contacts, deleted_ids, next_sync_token = fetch_google_contacts()
+
+    full_sync = sync_token is None
     google_ids = set()
 
-    conn = get_db_connection()
-    c = conn.cursor()
-
-    inserted = 0
-    updated = 0
     now = datetime.now().isoformat()
 
-    for contact in google_contacts:
-        google_id = contact["google_id"]
-        google_ids.add(google_id)
-
-        emails_json = json.dumps(contact["emails"]) if contact["emails"] else None
-        phones_json = json.dumps(contact["phones"]) if contact["phones"] else None
-
-        # Check if exists
-        c.execute("SELECT id FROM contacts WHERE google_id = ?", (google_id,))
-        existing = c.fetchone()
-
-        if existing:
-            # Update but preserve notes
-            c.execute("""
-                UPDATE contacts
-                SET name = ?, emails = ?, phones = ?, organization = ?, synced_at = ?, updated_at = ?
-                WHERE google_id = ?
-            """, (contact["name"], emails_json, phones_json, contact["organization"], now, now, google_id))
-            updated += 1
+    rows = []
+    inserted = 0
+    with write_transaction() as conn:
+        # Look up all existing contacts once instead of one SELECT per contact
+        existing_ids = {
+            row["google_id"]
+            for row in conn.execute("SELECT google_id FROM contacts WHERE google_id IS NOT NULL")
+        }
+
+        for contact in google_contacts:
+            google_id = contact["google_id"]
+            google_ids.add(google_id)
+
+            emails_json = json.dumps(contact["emails"]) if contact["emails"] else None
+            phones_json = json.dumps(contact["phones"]) if contact["phones"] else None
+
+            if google_id not in existing_ids:
+                inserted += 1
+                existing_ids.add(google_id)
+
+            rows.append((google_id, contact["name"], emails_json, phones_json, contact["organization"], now, now, now))
+
+        # Let SQLite decide insert vs. update; notes are never touched
+        conn.executemany("""
+            INSERT INTO contacts (google_id, name, emails, phones, organization, synced_at, created_at, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(google_id) DO UPDATE SET
+                name = excluded.name,
+                emails = excluded.emails,
+                phones = excluded.phones,
+                organization = excluded.organization,
+                synced_at = excluded.synced_at,
+                updated_at = excluded.updated_at
+        """, rows)
+        updated = len(rows) - inserted
+
+        # Delete contacts no longer in Google (but only if they have no notes).
+        # The IDs go in as one JSON array parameter - no per-ID placeholders,
+        # so the statement stays the same and can't hit the variable limit
+        if full_sync and google_ids:
+            deleted = conn.execute("""
+                DELETE FROM contacts
+                WHERE google_id NOT IN (SELECT value FROM json_each(?))
+                AND (notes IS NULL OR notes = '')
+            """, (json.dumps(list(google_ids)),)).rowcount
+        elif not full_sync and deleted_ids:
+            deleted = conn.execute("""
+                DELETE FROM contacts
+                WHERE google_id IN (SELECT value FROM json_each(?))
+                AND (notes IS NULL OR notes = '')
+            """, (json.dumps(list(deleted_ids)),)).rowcount
         else:
-            c.execute("""
-                INSERT INTO contacts (google_id, name, emails, phones, organization, synced_at, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (google_id, contact["name"], emails_json, phones_json, contact["organization"], now, now, now))
-            inserted += 1
-
-    # Delete contacts no longer in Google (but only if they have no notes)
-    if google_ids:
-        placeholders = ",".join("?" * len(google_ids))
-        c.execute(f"""
-            DELETE FROM contacts
-            WHERE google_id NOT IN ({placeholders})
-            AND (notes IS NULL OR notes = '')
-        """, tuple(google_ids))
-        deleted = c.rowcount
-    else:
-        deleted = 0
+            deleted = 0
 
-    conn.commit()
-    conn.close()
+        if next_sync_token:
+            conn.execute("""
+                INSERT INTO sync_state (key, value, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+            """, (CONTACTS_SYNC_TOKEN_KEY, next_sync_token, now))
 
     return {
+        "full_sync": full_sync,
         "total_google": len(google_contacts),
         "inserted": inserted,
         "updated": updated,
@@ -159,101 +335,99 @@ def sync_contacts_to_db() -> dict:
     }
 
 
+def build_fts_query(query: str) -> str:
+    """Turn free text into an FTS5 prefix query, e.g. 'ann hu' -> '"ann"* "hu"*'."""
+    terms = [term.replace('"', '""') for term in query.split()]
+    return " ".join(f'"{term}"*' for term in terms)
+
+
 def search_contacts(query: str) -> list[dict]:
-    """Search local contacts by name."""
+    """Search local contacts by name, organization or notes."""
     conn = get_db_connection()
-    c = conn.cursor()
 
-    search_pattern = f"%{query}%"
-    c.execute("""
-        SELECT id, google_id, name, emails, phones, organization, notes
-        FROM contacts WHERE name LIKE ? COLLATE NOCASE
-        ORDER BY name
-        LIMIT 20
-    """, (search_pattern,))
-    rows = c.fetchall()
-    conn.close()
+    fts_query = build_fts_query(query)
+    if fts_query:
+        rows = conn.execute("""
+            SELECT c.id, c.google_id, c.name, c.emails AS "emails [JSON]", c.phones AS "phones [JSON]",
+                   c.organization, c.notes
+            FROM contacts_fts f JOIN contacts c ON c.id = f.rowid
+            WHERE contacts_fts MATCH ?
+            ORDER BY rank
+            LIMIT 20
+        """, (fts_query,)).fetchall()
+    else:
+        rows = conn.execute("""
+            SELECT id, google_id, name, emails AS "emails [JSON]", phones AS "phones [JSON]",
+                   organization, notes
+            FROM contacts
+            ORDER BY name
+            LIMIT 20
+        """).fetchall()
 
     return [{
-        "id": r[0],
-        "google_id": r[1],
-        "name": r[2],
-        "emails": json.loads(r[3]) if r[3] else [],
-        "phones": json.loads(r[4]) if r[4] else [],
-        "organization": r[5],
-        "notes": r[6]
+        "id": r["id"],
+        "google_id": r["google_id"],
+        "name": r["name"],
+        "emails": r["emails"] or [],
+        "phones": r["phones"] or [],
+        "organization": r["organization"],
+        "notes": r["notes"]
     } for r in rows]
 
 
 def get_contact_notes(contact_id: int) -> dict | None:
     """Get a contact with their notes."""
     conn = get_db_connection()
-    c = conn.cursor()
 
-    c.execute("""
+    row = conn.execute("""
         SELECT id, name, notes FROM contacts WHERE id = ?
-    """, (contact_id,))
-    row = c.fetchone()
-    conn.close()
+    """, (contact_id,)).fetchone()
 
     if row:
-        return {"id": row[0], "name": row[1], "notes": row[2]}
+        return dict(row)
     return None
 
 
 def update_notes(contact_id: int, notes: str, append: bool = True) -> bool:
     """Update or append to a contact's notes."""
-    conn = get_db_connection()
-    c = conn.cursor()
-
-    if append:
-        c.execute("SELECT notes FROM contacts WHERE id = ?", (contact_id,))
-        row = c.fetchone()
-        if not row:
-            conn.close()
-            return False
-
-        existing_notes = row[0] or ""
-        timestamp = datetime.now().strftime("%Y-%m-%d")
-        new_entry = f"{timestamp}: {notes}"
-
-        if existing_notes:
-            updated_notes = f"{existing_notes}\n{new_entry}"
+    with write_transaction() as conn:
+        if append:
+            row = conn.execute("SELECT notes FROM contacts WHERE id = ?", (contact_id,)).fetchone()
+            if not row:
+                return False
+
+            existing_notes = row["notes"] or ""
+            timestamp = datetime.now().strftime("%Y-%m-%d")
+            new_entry = f"{timestamp}: {notes}"
+
+            if existing_notes:
+                updated_notes = f"{existing_notes}\n{new_entry}"
+            else:
+                updated_notes = new_entry
         else:
-            updated_notes = new_entry
-    else:
-        updated_notes = notes
+            updated_notes = notes
 
-    now = datetime.now().isoformat()
-    c.execute("UPDATE contacts SET notes = ?, updated_at = ? WHERE id = ?", (updated_notes, now, contact_id))
-
-    success = c.rowcount > 0
-    conn.commit()
-    conn.close()
+        now = datetime.now().isoformat()
+        cursor = conn.execute(
+            "UPDATE contacts SET notes = ?, updated_at = ? WHERE id = ?",
+            (updated_notes, now, contact_id)
+        )
 
-    return success
+        return cursor.rowcount > 0
 
 
 def list_contacts_with_notes_db() -> list[dict]:
     """Get all contacts that have notes."""
     conn = get_db_connection()
-    c = conn.cursor()
 
-    c.execute("""
+    rows = conn.execute("""
         SELECT id, name, organization, notes
         FROM contacts
         WHERE notes IS NOT NULL AND notes != ''
         ORDER BY name
-    """)
-    rows = c.fetchall()
-    conn.close()
+    """).fetchall()
 
-    return [{
-        "id": r[0],
-        "name": r[1],
-        "organization": r[2],
-        "notes": r[3]
-    } for r in rows]
+    return [dict(r) for r in rows]
 
 
 @server.list_tools()
@@ -271,7 +445,7 @@ async def list_tools() -> list[Tool]:
         ),
         Tool(
             name="search_contacts",
-            description="Sucht lokale Kontakte nach Name. Gibt bis zu 20 passende Kontakte zurück.",
+            description="Sucht lokale Kontakte nach Name, Firma oder Notizen (Wortanfänge). Gibt bis zu 20 passende Kontakte zurück.",
             inputSchema={
                 "type": "object",
                 "properties": {
@@ -338,21 +512,23 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
 
     if name == "sync_contacts":
         try:
-            stats = sync_contacts_to_db()
+            stats = await asyncio.to_thread(sync_contacts_to_db)
+            source = "Kontakte von Google" if stats["full_sync"] else "geänderte Kontakte von Google"
             result = (
                 f"Kontakte synchronisiert:\n"
-                f"• {stats['total_google']} Kontakte von Google\n"
+                f"• {stats['total_google']} {source}\n"
                 f"• {stats['inserted']} neu hinzugefügt\n"
                 f"• {stats['updated']} aktualisiert\n"
                 f"• {stats['deleted']} gelöscht (ohne Notizen)"
             )
             return [TextContent(type="text", text=result)]
         except Exception as e:
+            invalidate_google_service(e)
             return [TextContent(type="text", text=f"Fehler beim Synchronisieren: {str(e)}")]
 
     elif name == "search_contacts":
         query = arguments.get("query", "")
-        contacts = search_contacts(query)
+        contacts = await asyncio.to_thread(search_contacts, query)
 
         if contacts:
             result = f"Gefundene Kontakte für '{query}':\n"
@@ -365,7 +541,7 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
 
     elif name == "get_contact_notes":
         contact_id = arguments.get("contact_id")
-        contact = get_contact_notes(contact_id)
+        contact = await asyncio.to_thread(get_contact_notes, contact_id)
 
         if contact:
             notes = contact['notes'] or "Keine Notizen vorhanden."
@@ -379,7 +555,7 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         notes = arguments.get("notes", "")
         append = arguments.get("append", True)
 
-        success = update_notes(contact_id, notes, append)
+        success = await asyncio.to_thread(update_notes, contact_id, notes, append)
 
         if success:
             return [TextContent(type="text", text=f"Notiz gespeichert für Kontakt ID {contact_id}.")]
@@ -387,7 +563,7 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
             return [TextContent(type="text", text=f"Fehler: Kontakt mit ID {contact_id} nicht gefunden.")]
 
     elif name == "list_contacts_with_notes":
-        contacts = list_contacts_with_notes_db()
+        contacts = await asyncio.to_thread(list_contacts_with_notes_db)
 
         if contacts:
             result = "Kontakte mit Notizen:\n\n"
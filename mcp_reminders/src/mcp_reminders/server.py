@@ -2,17 +2,22 @@
 MCP Server for Reminders.
 
 Provides timer-based reminders with HTTP callback to Luna bot.
-Each reminder gets its own asyncio timer - no polling.
+A single asyncio timer is armed for the next due reminder - no polling.
 """
 
 import asyncio
+import heapq
 import json
+import logging
 import os
-import sqlite3
+import sys
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
 from pathlib import Path
 from zoneinfo import ZoneInfo
 
+import aiosqlite
 import httpx
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
@@ -22,134 +27,297 @@ from mcp.types import Tool, TextContent
 DB_PATH = Path(os.getenv("LUNA_DB_PATH", "data/luna.db"))
 CALLBACK_URL = os.getenv("LUNA_CALLBACK_URL", "http://localhost:8765/reminder")
 TIMEZONE = ZoneInfo("Europe/Vienna")
+MAX_TIMER_DELAY = 3600
+# Fired reminders are marked as sent in batches of up to SENT_BATCH_SIZE,
+# collected for at most SENT_FLUSH_DELAY seconds
+SENT_BATCH_SIZE = 64
+SENT_FLUSH_DELAY = 0.25
+# Callbacks in flight at once, e.g. when many reminders fell due while the server was down
+MAX_CONCURRENT_CALLBACKS = 16
 
 server = Server("reminders")
+# stdout carries the MCP protocol, so logs go to stderr (see main())
+logger = logging.getLogger("reminders")
+
+# Pending reminders are kept in one heap with a single loop timer armed for
+# the soonest one, instead of one sleeping task per reminder.
+# Heap of (remind_at_ms, reminder_id) int tuples, so heap operations only do
+# C-level int comparisons; stale entries are skipped lazily
+timer_heap: list[tuple[int, int]] = []
+# {reminder_id: (remind_at_ms, message)} - the source of truth for live reminders
+pending_reminders: dict[int, tuple[int, str]] = {}
+next_timer: asyncio.TimerHandle | None = None
+# Running fire_reminder() tasks - the event loop itself only keeps weak references
+background_tasks: set[asyncio.Task] = set()
+# IDs of fired reminders waiting to be marked as sent
+sent_queue: asyncio.Queue[int] = asyncio.Queue()
+sent_flusher: asyncio.Task | None = None
+
+
+class ConnectionPool:
+    """A single writer connection plus a few reader connections.
+
+    SQLite serializes writers anyway, so writes share one connection behind
+    a lock while reads check out one of the reader connections.
+    """
+
+    def __init__(self, db_path: Path, readers: int = 3):
+        self.db_path = db_path
+        self.size = readers
+        self._readers: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        self._writer: aiosqlite.Connection | None = None
+        self._write_lock = asyncio.Lock()
+
+    async def _connect(self) -> aiosqlite.Connection:
+        # sqlite3 keeps prepared statements per connection, so with pooled
+        # connections each query is only parsed and planned once
+        conn = await aiosqlite.connect(self.db_path, cached_statements=256)
+        # Per-connection setup, paid once instead of on every query
+        await conn.execute("PRAGMA journal_mode=WAL")
+        await conn.execute("PRAGMA synchronous=NORMAL")
+        await conn.execute("PRAGMA temp_store=MEMORY")
+        await conn.execute("PRAGMA mmap_size=268435456")
+        await conn.execute("PRAGMA cache_size=-20000")
+        return conn
+
+    async def open(self):
+        self._writer = await self._connect()
+        for _ in range(self.size):
+            self._readers.put_nowait(await self._connect())
+
+    async def close(self):
+        while not self._readers.empty():
+            await self._readers.get_nowait().close()
+        if self._writer is not None:
+            await self._writer.close()
+            self._writer = None
+
+    @asynccontextmanager
+    async def reader(self):
+        conn = await self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put_nowait(conn)
+
+    @asynccontextmanager
+    async def writer(self):
+        async with self._write_lock:
+            yield self._writer
+
+
+# Opened in startup()
+pool: ConnectionPool | None = None
+# Shared client so callbacks reuse a kept-alive connection to the bot
+http_client: httpx.AsyncClient | None = None
+
+
+async def add_reminder_to_db(message: str, remind_at: datetime) -> int:
+    """Insert reminder into database. Returns reminder ID.
+
+    A retried call for an identical pending reminder returns the existing ID.
+    """
+    remind_at_ts = int(remind_at.timestamp())
+    async with pool.writer() as conn:
+        # Served from the pending-reminders covering index
+        async with conn.execute(
+            "SELECT id FROM reminders WHERE sent = FALSE AND remind_at_ts = ? AND message = ?",
+            (remind_at_ts, message)
+        ) as cursor:
+            row = await cursor.fetchone()
+        if row:
+            return row[0]
+
+        cursor = await conn.execute(
+            "INSERT INTO reminders (message, remind_at, remind_at_ts) VALUES (?, ?, ?)",
+            (message, remind_at.isoformat(), remind_at_ts)
+        )
+        await conn.commit()
 
-# Track active timers: {reminder_id: asyncio.Task}
-active_timers: dict[int, asyncio.Task] = {}
+    return cursor.lastrowid
 
 
-def get_db_connection():
-    """Get SQLite database connection."""
-    return sqlite3.connect(DB_PATH)
+async def mark_reminder_sent(reminder_id: int):
+    """Queue a reminder to be marked as sent by flush_sent_reminders()."""
+    await sent_queue.put(reminder_id)
 
 
-def add_reminder_to_db(message: str, remind_at: datetime) -> int:
-    """Insert reminder into database. Returns reminder ID."""
-    conn = get_db_connection()
-    c = conn.cursor()
+async def write_sent_reminders(reminder_ids: list[int]):
+    """Mark a batch of reminders as sent with a single commit."""
+    placeholders = ",".join("?" * len(reminder_ids))
+    async with pool.writer() as conn:
+        await conn.execute(
+            f"UPDATE reminders SET sent = TRUE WHERE id IN ({placeholders})",
+            reminder_ids
+        )
+        await conn.commit()
 
-    c.execute(
-        "INSERT INTO reminders (message, remind_at) VALUES (?, ?)",
-        (message, remind_at.isoformat())
-    )
 
-    reminder_id = c.lastrowid
-    conn.commit()
-    conn.close()
+async def flush_sent_reminders():
+    """Background worker: collect fired reminder IDs and mark them sent in batches."""
+    while True:
+        reminder_ids = [await sent_queue.get()]
+        try:
+            try:
+                while len(reminder_ids) < SENT_BATCH_SIZE:
+                    reminder_ids.append(await asyncio.wait_for(sent_queue.get(), SENT_FLUSH_DELAY))
+            except asyncio.TimeoutError:
+                pass
+
+            await write_sent_reminders(reminder_ids)
+        except asyncio.CancelledError:
+            # Hand the batch back so drain_sent_queue() writes it on shutdown
+            # (marking an already-written ID again is harmless)
+            for reminder_id in reminder_ids:
+                sent_queue.put_nowait(reminder_id)
+            raise
+        except Exception:
+            logger.warning("Failed to mark reminders %s as sent", reminder_ids, exc_info=True)
+
+
+async def drain_sent_queue():
+    """Write out any queued sent-markers, e.g. on shutdown."""
+    reminder_ids = []
+    while not sent_queue.empty():
+        reminder_ids.append(sent_queue.get_nowait())
+    if reminder_ids:
+        await write_sent_reminders(reminder_ids)
+
+
+async def delete_reminder_from_db(reminder_id: int) -> bool:
+    """Delete a reminder from database. Returns True if deleted."""
+    async with pool.writer() as conn:
+        cursor = await conn.execute("DELETE FROM reminders WHERE id = ?", (reminder_id,))
+        await conn.commit()
 
-    return reminder_id
+    return cursor.rowcount > 0
 
 
-def mark_reminder_sent(reminder_id: int):
-    """Mark a reminder as sent in the database."""
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute("UPDATE reminders SET sent = TRUE WHERE id = ?", (reminder_id,))
-    conn.commit()
-    conn.close()
+async def get_pending_reminders() -> list[dict]:
+    """Get all pending (unsent) reminders from database."""
+    async with pool.reader() as conn:
+        async with conn.execute(
+            "SELECT id, message, remind_at_ts FROM reminders WHERE sent = FALSE ORDER BY remind_at_ts"
+        ) as cursor:
+            rows = await cursor.fetchall()
 
+    return [{"id": r[0], "message": r[1], "remind_at_ts": r[2]} for r in rows]
 
-def delete_reminder_from_db(reminder_id: int) -> bool:
-    """Delete a reminder from database. Returns True if deleted."""
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute("DELETE FROM reminders WHERE id = ?", (reminder_id,))
-    deleted = c.rowcount > 0
-    conn.commit()
-    conn.close()
-    return deleted
 
+async def fire_reminder(reminder_id: int, message: str):
+    """Send reminder via HTTP callback to Luna bot."""
+    try:
+        await http_client.post(
+            CALLBACK_URL,
+            json={"id": reminder_id, "message": message}
+        )
+        await mark_reminder_sent(reminder_id)
+    except Exception:
+        logger.warning("Failed to fire reminder %d", reminder_id, exc_info=True)
 
-def get_pending_reminders() -> list[dict]:
-    """Get all pending (unsent) reminders from database."""
-    conn = get_db_connection()
-    c = conn.cursor()
 
-    c.execute(
-        "SELECT id, message, remind_at FROM reminders WHERE sent = FALSE ORDER BY remind_at"
-    )
+async def fire_reminders(due: list[tuple[int, str]]):
+    """Fire due reminders in chunks of MAX_CONCURRENT_CALLBACKS."""
+    for i in range(0, len(due), MAX_CONCURRENT_CALLBACKS):
+        await asyncio.gather(*(
+            fire_reminder(reminder_id, message)
+            for reminder_id, message in due[i:i + MAX_CONCURRENT_CALLBACKS]
+        ))
 
-    rows = c.fetchall()
-    conn.close()
 
-    return [{"id": r[0], "message": r[1], "remind_at": r[2]} for r in rows]
+def spawn(coro) -> asyncio.Task:
+    """Start a background task, holding a reference only until it finishes."""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
 
 
-async def fire_reminder(reminder_id: int, message: str):
-    """Send reminder via HTTP callback to Luna bot."""
-    try:
-        async with httpx.AsyncClient() as client:
-            await client.post(
-                CALLBACK_URL,
-                json={"id": reminder_id, "message": message},
-                timeout=10.0
-            )
-        mark_reminder_sent(reminder_id)
-    except Exception as e:
-        print(f"Failed to fire reminder {reminder_id}: {e}")
-    finally:
-        # Remove from active timers
-        active_timers.pop(reminder_id, None)
+def dispatch_due_reminders():
+    """Fire all reminders that are due, then arm the timer for the next one."""
+    global next_timer
 
+    next_timer = None
+    now = now_ms()
+    due = []
+    while timer_heap and timer_heap[0][0] <= now:
+        when, reminder_id = heapq.heappop(timer_heap)
+        entry = pending_reminders.get(reminder_id)
+        if entry is None or entry[0] != when:
+            continue  # Cancelled or rescheduled
+        del pending_reminders[reminder_id]
+        due.append((reminder_id, entry[1]))
 
-async def schedule_reminder(reminder_id: int, message: str, remind_at: datetime):
-    """Schedule a reminder to fire at the specified time."""
-    now = datetime.now(TIMEZONE)
+    # One task per dispatch rather than one per reminder
+    if due:
+        spawn(fire_reminders(due))
 
-    # Parse remind_at if it's a string
-    if isinstance(remind_at, str):
-        remind_at = datetime.fromisoformat(remind_at)
+    arm_next_timer(now)
 
-    # Add timezone if missing
-    if remind_at.tzinfo is None:
-        remind_at = remind_at.replace(tzinfo=TIMEZONE)
 
-    delay = (remind_at - now).total_seconds()
+def now_ms() -> int:
+    """Current wall-clock time in unix milliseconds."""
+    return time.time_ns() // 1_000_000
 
-    if delay <= 0:
-        # Already due, fire immediately
-        await fire_reminder(reminder_id, message)
-    else:
-        # Wait and then fire
-        await asyncio.sleep(delay)
-        await fire_reminder(reminder_id, message)
 
+def arm_next_timer(now: int | None = None):
+    """Schedule a single loop callback for the soonest pending reminder.
+
+    `now` lets the dispatcher reuse the clock reading it already took.
+    """
+    global next_timer
+
+    # Drop cancelled/rescheduled entries from the head of the heap
+    while timer_heap and pending_reminders.get(timer_heap[0][1], (None,))[0] != timer_heap[0][0]:
+        heapq.heappop(timer_heap)
+
+    if next_timer is not None:
+        next_timer.cancel()
+        next_timer = None
 
-def start_reminder_timer(reminder_id: int, message: str, remind_at: datetime):
-    """Start an asyncio task for a reminder."""
-    # Cancel existing timer if any
-    if reminder_id in active_timers:
-        active_timers[reminder_id].cancel()
+    if timer_heap:
+        loop = asyncio.get_running_loop()
+        # Re-check at least every MAX_TIMER_DELAY so wall-clock changes are picked up
+        if now is None:
+            now = now_ms()
+        delay = min(max((timer_heap[0][0] - now) / 1000, 0), MAX_TIMER_DELAY)
+        next_timer = loop.call_at(loop.time() + delay, dispatch_due_reminders)
 
-    # Create new timer task
-    task = asyncio.create_task(schedule_reminder(reminder_id, message, remind_at))
-    active_timers[reminder_id] = task
+
+def push_reminder(reminder_id: int, message: str, when: int) -> bool:
+    """Add a reminder due at unix ms `when` to the heap. Returns True if it became the next one due."""
+    pending_reminders[reminder_id] = (when, message)
+    heapq.heappush(timer_heap, (when, reminder_id))
+    return timer_heap[0] == (when, reminder_id)
+
+
+def start_reminder_timer(reminder_id: int, message: str, when: int):
+    """Schedule a reminder to fire at unix ms `when`."""
+    if pending_reminders.get(reminder_id) == (when, message):
+        return  # Already scheduled, e.g. a retried create_reminder
+    # A previous entry for the same ID is dropped lazily by the dispatcher
+    if push_reminder(reminder_id, message, when) or next_timer is None:
+        arm_next_timer()
 
 
 def cancel_reminder_timer(reminder_id: int):
     """Cancel a reminder's timer if it exists."""
-    task = active_timers.pop(reminder_id, None)
-    if task:
-        task.cancel()
+    # The heap entry is skipped lazily once it reaches the head
+    pending_reminders.pop(reminder_id, None)
+
+    # Compact once most of the heap consists of cancelled entries
+    if len(timer_heap) > 2 * len(pending_reminders) + 64:
+        timer_heap[:] = [(when, rid) for rid, (when, _) in pending_reminders.items()]
+        heapq.heapify(timer_heap)
 
 
 async def restore_pending_reminders():
     """Restore timers for all pending reminders on server start."""
-    reminders = get_pending_reminders()
+    reminders = await get_pending_reminders()
     for r in reminders:
-        start_reminder_timer(r["id"], r["message"], r["remind_at"])
-    print(f"Restored {len(reminders)} pending reminder timers")
+        push_reminder(r["id"], r["message"], r["remind_at_ts"] * 1000)
+    arm_next_timer()
+    logger.info("Restored %d pending reminder timers", len(reminders))
 
 
 @server.list_tools()
@@ -217,10 +385,10 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
                 remind_at = remind_at.replace(tzinfo=TIMEZONE)
 
             # Save to DB
-            reminder_id = add_reminder_to_db(message, remind_at)
+            reminder_id = await add_reminder_to_db(message, remind_at)
 
             # Start timer
-            start_reminder_timer(reminder_id, message, remind_at)
+            start_reminder_timer(reminder_id, message, int(remind_at.timestamp() * 1000))
 
             # Format response
             time_str = remind_at.strftime("%d.%m. um %H:%M")
@@ -230,20 +398,19 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
             return [TextContent(type="text", text=f"Fehler: Ungültiges Datumsformat. Bitte YYYY-MM-DDTHH:MM verwenden.")]
 
     elif name == "list_reminders":
-        reminders = get_pending_reminders()
+        reminders = await get_pending_reminders()
 
         if not reminders:
             return [TextContent(type="text", text="Keine ausstehenden Erinnerungen.")]
 
-        lines = ["Ausstehende Erinnerungen:"]
-        for r in reminders:
-            remind_at = datetime.fromisoformat(r["remind_at"])
-            if remind_at.tzinfo is None:
-                remind_at = remind_at.replace(tzinfo=TIMEZONE)
-            time_str = remind_at.strftime("%d.%m. %H:%M")
-            lines.append(f"• [{r['id']}] {time_str}: {r['message']}")
-
-        return [TextContent(type="text", text="\n".join(lines))]
+        text = "\n".join([
+            "Ausstehende Erinnerungen:",
+            *(
+                f"• [{r['id']}] {datetime.fromtimestamp(r['remind_at_ts'], TIMEZONE):%d.%m. %H:%M}: {r['message']}"
+                for r in reminders
+            )
+        ])
+        return [TextContent(type="text", text=text)]
 
     elif name == "delete_reminder":
         reminder_id = arguments.get("reminder_id")
@@ -255,7 +422,7 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         cancel_reminder_timer(reminder_id)
 
         # Delete from DB
-        deleted = delete_reminder_from_db(reminder_id)
+        deleted = await delete_reminder_from_db(reminder_id)
 
         if deleted:
             return [TextContent(type="text", text=f"Erinnerung {reminder_id} gelöscht.")]
@@ -266,21 +433,60 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         return [TextContent(type="text", text=f"Unbekanntes Tool: {name}")]
 
 
+async def startup():
+    """Open the connection pool and HTTP client and start the sent-flusher."""
+    global pool, http_client, sent_flusher
+
+    pool = ConnectionPool(DB_PATH)
+    await pool.open()
+    http_client = httpx.AsyncClient(
+        timeout=10.0,
+        limits=httpx.Limits(max_keepalive_connections=4)
+    )
+    sent_flusher = asyncio.create_task(flush_sent_reminders())
+
+
+async def shutdown():
+    """Stop the sent-flusher, write out what it had queued and close resources."""
+    global sent_flusher
+
+    if sent_flusher is not None:
+        sent_flusher.cancel()
+        try:
+            await sent_flusher
+        except asyncio.CancelledError:
+            pass
+        sent_flusher = None
+    await drain_sent_queue()
+    await http_client.aclose()
+    await pool.close()
+
+
 async def run_server():
     """Run the MCP server."""
-    # Restore pending reminders on startup
-    await restore_pending_reminders()
-
-    async with stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            server.create_initialization_options()
-        )
+    await startup()
+
+    try:
+        # Restore pending reminders on startup
+        await restore_pending_reminders()
+
+        async with stdio_server() as (read_stream, write_stream):
+            await server.run(
+                read_stream,
+                write_stream,
+                server.create_initialization_options()
+            )
+    finally:
+        await shutdown()
 
 
 def main():
     """Entry point for the MCP server."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s | %(levelname)-8s | %(name)s | %(message)s",
+        stream=sys.stderr
+    )
     asyncio.run(run_server())
 
 
@@ -1,321 +1,385 @@
 import asyncio
-import hashlib
-import sqlite3
+import itertools
+import logging
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+from urllib.parse import urlparse
+from aiohttp import web
 from telebot.async_telebot import AsyncTeleBot
-from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton
+from telebot import util
+from telebot.asyncio_helper import ApiTelegramException
+from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton, Update
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from luna.config import (
     TELEGRAM_BOT_TOKEN, ALLOWED_USER_IDS, DAILY_SUMMARY_HOUR,
-    DAILY_SUMMARY_MINUTE, USER_CHAT_ID, DB_PATH, get_logger
+    DAILY_SUMMARY_MINUTE, USER_CHAT_ID, WEBHOOK_URL, WEBHOOK_LISTEN,
+    WEBHOOK_PORT, WEBHOOK_SECRET, get_logger
 )
+from luna import contacts
 from luna import llm
 from luna import memory
 
-# Temporary storage for pending facts that need disambiguation
+try:
+    import uvloop
+except ImportError:  # optional, falls back to the default asyncio loop
+    uvloop = None
+
+# Temporary storage for pending facts that need disambiguation, oldest first
 # Format: {fact_hash: {"fact": str, "matches": list, "timestamp": float}}
-pending_facts: dict[str, dict] = {}
+pending_facts: OrderedDict[str, dict] = OrderedDict()
+# Unanswered disambiguations are dropped after PENDING_FACT_TTL seconds or
+# once there are more than MAX_PENDING_FACTS of them
+PENDING_FACT_TTL = 3600
+MAX_PENDING_FACTS = 1024
+# Source of the opaque keys into pending_facts used in callback data
+_pending_fact_ids = itertools.count()
+
+# Fixed reply texts
+WELCOME_TEXT = (
+    "Hallo! Ich bin Luna, dein persönlicher Assistent.\n\n"
+    "Ich kann:\n"
+    "- Fragen beantworten (Text oder Sprache)\n"
+    "- Deinen Kalender checken (/heute, /morgen)\n"
+    "- Mir Dinge über deine Kontakte merken\n"
+    "- Dir jeden Morgen eine Zusammenfassung schicken\n\n"
+    "Befehle:\n"
+    "/kontakte - Kontakte von Google synchronisieren\n"
+    "/fakten - Gespeicherte Notizen anzeigen\n"
+    "/kontakt <name> - Kontakt suchen\n"
+    "/heute, /morgen - Kalender-Events\n"
+    "/clear - Konversation löschen\n\n"
+    "Schreib mir einfach oder schick eine Sprachnachricht!"
+)
+NOT_AUTHORIZED_TEXT = "Nicht autorisiert."
+KONTAKT_USAGE_TEXT = "Nutzung: /kontakt Name"
+CANCEL_BUTTON_TEXT = "Abbrechen"
+NO_NOTES_TEXT = (
+    "Noch keine Notizen zu Kontakten gespeichert!\n\n"
+    "Nutze /kontakte um Kontakte von Google zu synchronisieren."
+)
 
 # =============================================================================
 # LOGGING SETUP
 # =============================================================================
 logger = get_logger("bot")
 logger.info("Bot module loading...")
-logger.debug(f"Imported modules: telebot, apscheduler, config, llm, memory")
+logger.debug("Imported modules: telebot, apscheduler, config, llm, memory")
 
 # =============================================================================
 # BOT INITIALIZATION
 # =============================================================================
 logger.info("Initializing Telegram bot...")
-logger.debug(f"Bot token length: {len(TELEGRAM_BOT_TOKEN) if TELEGRAM_BOT_TOKEN else 0}")
+logger.debug("Bot token length: %s", len(TELEGRAM_BOT_TOKEN) if TELEGRAM_BOT_TOKEN else 0)
 bot = AsyncTeleBot(TELEGRAM_BOT_TOKEN)
 logger.info("Telegram bot initialized successfully")
 
+
+class TokenBucket:
+    """Token bucket allowing `rate` sends per second with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+# Telegram allows about 30 messages per second per bot and about one per
+# second per chat; staying below that avoids 429 retry-after stalls
+global_send_bucket = TokenBucket(30, 30)
+chat_send_buckets: defaultdict[int, TokenBucket] = defaultdict(lambda: TokenBucket(1, 3))
+
+
+# Attempts per outgoing message when Telegram answers 429 Too Many Requests
+MAX_SEND_ATTEMPTS = 3
+
+# Caps on concurrent outbound LLM and direct MCP calls across all handlers
+llm_semaphore = asyncio.Semaphore(4)
+mcp_semaphore = asyncio.Semaphore(2)
+
+
+async def rate_limited_send(chat_id: int, send):
+    """Await send() within the rate limits, backing off when Telegram answers 429."""
+    for attempt in range(MAX_SEND_ATTEMPTS):
+        await global_send_bucket.acquire()
+        await chat_send_buckets[chat_id].acquire()
+        try:
+            return await send()
+        except ApiTelegramException as e:
+            if e.error_code != 429 or attempt == MAX_SEND_ATTEMPTS - 1:
+                raise
+            retry_after = e.result_json.get("parameters", {}).get("retry_after", 2 ** attempt)
+            logger.warning("Telegram rate limit hit - retrying in %ss", retry_after)
+            await asyncio.sleep(retry_after)
+
+
+async def send_message(chat_id: int, text: str, **kwargs):
+    """Rate-limited bot.send_message."""
+    return await rate_limited_send(chat_id, lambda: bot.send_message(chat_id, text, **kwargs))
+
+
+async def reply_to(message, text: str, **kwargs):
+    """Rate-limited bot.reply_to."""
+    return await rate_limited_send(message.chat.id, lambda: bot.reply_to(message, text, **kwargs))
+
+
+# Fire-and-forget tasks - the event loop itself only keeps weak references
+background_tasks: set[asyncio.Task] = set()
+
+
+def spawn(coro) -> asyncio.Task:
+    """Start a background task, holding a reference only until it finishes."""
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+
+async def send_typing(chat_id: int):
+    """Show the typing indicator; failures are only logged."""
+    try:
+        await bot.send_chat_action(chat_id, 'typing')
+    except Exception as e:
+        logger.warning(f"Failed to send typing indicator: {e}")
+
+
+async def call_mcp_tool(tool_name: str, arguments: dict = None) -> str:
+    """llm.call_mcp_tool, limited to mcp_semaphore concurrent calls."""
+    async with mcp_semaphore:
+        return await llm.call_mcp_tool(tool_name, arguments)
+
+
 logger.info("Initializing AsyncIO scheduler...")
 scheduler = AsyncIOScheduler()
 logger.info("Scheduler initialized successfully")
 
 
+# Update types the bot handles; Telegram does not send the others at all
+ALLOWED_UPDATES = ["message", "callback_query"]
+# Seconds a long poll is held open; the HTTP timeout must outlast it
+POLLING_TIMEOUT = 50
+POLLING_REQUEST_TIMEOUT = 60
+
+# Error texts shown to the user are cut to this many characters; the full
+# text stays in the log
+MAX_ERROR_TEXT = 200
+
+
+async def log_and_reply(message, prefix: str, error: Exception):
+    """Log a handler failure with its traceback and tell the user."""
+    logger.exception("%s in handler for %r", prefix, message.text)
+    error_text = str(error)
+    if len(error_text) > MAX_ERROR_TEXT:
+        error_text = error_text[:MAX_ERROR_TEXT] + "…"
+    await reply_to(message, f"{prefix}: {error_text}")
+
+
 def is_authorized(message) -> bool:
     """Check if user is authorized to use the bot."""
-    logger.debug(f"is_authorized() called")
-    logger.debug(f"Message from user ID: {message.from_user.id}")
-    logger.debug(f"Username: {message.from_user.username}")
-    logger.debug(f"First name: {message.from_user.first_name}")
-    logger.debug(f"Last name: {message.from_user.last_name}")
-    logger.debug(f"ALLOWED_USER_IDS: {ALLOWED_USER_IDS}")
-
-    if not ALLOWED_USER_IDS:
-        logger.warning(f"ALLOWED_USER_IDS is empty - denying access")
-        logger.warning(f"Unauthorized access attempt from user {message.from_user.id}")
-        return False
-
-    is_auth = message.from_user.id in ALLOWED_USER_IDS
-    if is_auth:
-        logger.info(f"User {message.from_user.id} ({message.from_user.username}) is AUTHORIZED")
-    else:
-        logger.warning(f"User {message.from_user.id} ({message.from_user.username}) is NOT AUTHORIZED")
-        logger.warning(f"Attempted user ID {message.from_user.id} not in allowed list: {ALLOWED_USER_IDS}")
+    # An empty ALLOWED_USER_IDS denies everyone
+    user_id = message.from_user.id
+    if user_id in ALLOWED_USER_IDS:
+        logger.debug("User %s is authorized", user_id)
+        return True
 
-    return is_auth
+    logger.warning("User %s (%s) is NOT AUTHORIZED", user_id, message.from_user.username)
+    return False
 
 
-@bot.message_handler(commands=['start'])
 async def send_welcome(message):
-    logger.info("=" * 60)
-    logger.info("/start command received")
-    logger.debug(f"Chat ID: {message.chat.id}")
-    logger.debug(f"Message ID: {message.message_id}")
-    logger.debug(f"Date: {message.date}")
-    logger.debug(f"Full message object: {message}")
-
     if not is_authorized(message):
         logger.warning("Sending unauthorized response")
-        await bot.reply_to(message, "Nicht autorisiert.")
+        await reply_to(message, NOT_AUTHORIZED_TEXT)
         logger.debug("Unauthorized response sent")
         return
 
     logger.info("Sending welcome message...")
-    await bot.reply_to(message,
-        "Hallo! Ich bin Luna, dein persönlicher Assistent.\n\n"
-        "Ich kann:\n"
-        "- Fragen beantworten (Text oder Sprache)\n"
-        "- Deinen Kalender checken (/heute, /morgen)\n"
-        "- Mir Dinge über deine Kontakte merken\n"
-        "- Dir jeden Morgen eine Zusammenfassung schicken\n\n"
-        "Befehle:\n"
-        "/kontakte - Kontakte von Google synchronisieren\n"
-        "/fakten - Gespeicherte Notizen anzeigen\n"
-        "/kontakt <name> - Kontakt suchen\n"
-        "/heute, /morgen - Kalender-Events\n"
-        "/clear - Konversation löschen\n\n"
-        "Schreib mir einfach oder schick eine Sprachnachricht!"
-    )
+    await reply_to(message, WELCOME_TEXT)
     logger.info("Welcome message sent successfully")
 
 
-@bot.message_handler(commands=['heute'])
 async def today_events(message):
-    logger.info("=" * 60)
-    logger.info("/heute command received")
-    logger.debug(f"Chat ID: {message.chat.id}")
-    logger.debug(f"User: {message.from_user.id} ({message.from_user.username})")
-
     if not is_authorized(message):
         logger.warning("Unauthorized /heute request - ignoring")
         return
 
     try:
         logger.info("Fetching today's calendar events via MCP...")
-        result = await llm.call_mcp_tool("get_events_today")
-        logger.debug(f"MCP result: {result}")
+        result = await call_mcp_tool("get_events_today")
+        logger.debug("MCP result: %s", result)
 
         response = f"Heute:\n{result}"
         logger.info("Sending events to user")
-        await bot.reply_to(message, response)
+        await reply_to(message, response)
         logger.debug("Events response sent")
     except Exception as e:
-        logger.error(f"Calendar error in /heute: {str(e)}", exc_info=True)
-        logger.error(f"Exception type: {type(e).__name__}")
-        await bot.reply_to(message, f"Kalenderfehler: {str(e)}")
-        logger.debug("Error response sent to user")
+        await log_and_reply(message, "Kalenderfehler", e)
 
 
-@bot.message_handler(commands=['morgen'])
 async def tomorrow_events(message):
-    logger.info("=" * 60)
-    logger.info("/morgen command received")
-    logger.debug(f"Chat ID: {message.chat.id}")
-    logger.debug(f"User: {message.from_user.id} ({message.from_user.username})")
-
     if not is_authorized(message):
         logger.warning("Unauthorized /morgen request - ignoring")
         return
 
     try:
         logger.info("Fetching tomorrow's calendar events via MCP...")
-        result = await llm.call_mcp_tool("get_events_tomorrow")
-        logger.debug(f"MCP result: {result}")
+        result = await call_mcp_tool("get_events_tomorrow")
+        logger.debug("MCP result: %s", result)
 
         response = f"Morgen:\n{result}"
         logger.info("Sending events to user")
-        await bot.reply_to(message, response)
+        await reply_to(message, response)
         logger.debug("Events response sent")
     except Exception as e:
-        logger.error(f"Calendar error in /morgen: {str(e)}", exc_info=True)
-        logger.error(f"Exception type: {type(e).__name__}")
-        await bot.reply_to(message, f"Kalenderfehler: {str(e)}")
-        logger.debug("Error response sent to user")
+        await log_and_reply(message, "Kalenderfehler", e)
 
 
-@bot.message_handler(commands=['fakten'])
 async def list_facts(message):
     """List all contacts with notes."""
-    logger.info("=" * 60)
-    logger.info("/fakten command received")
-    logger.debug(f"Chat ID: {message.chat.id}")
-    logger.debug(f"User: {message.from_user.id} ({message.from_user.username})")
-
     if not is_authorized(message):
         logger.warning("Unauthorized /fakten request - ignoring")
         return
 
     logger.info("Fetching contacts with notes...")
-    contacts = memory.get_contacts_with_notes()
-    logger.debug(f"Found {len(contacts)} contacts with notes")
-
-    if contacts:
-        response = "Gespeicherte Notizen:\n\n"
-        for c in contacts[:20]:  # Limit to 20
-            response += f"**{c['name']}**\n{c['notes']}\n\n"
-            logger.debug(f"Added notes for: {c['name']}")
-        logger.info(f"Sending notes for {min(len(contacts), 20)} contacts to user")
-        await bot.reply_to(message, response, parse_mode="Markdown")
+    contacts_with_notes = await asyncio.to_thread(memory.get_contacts_with_notes, limit=20)
+    logger.debug("Found %s contacts with notes", len(contacts_with_notes))
+
+    if contacts_with_notes:
+        response = "Gespeicherte Notizen:\n\n" + "".join(
+            f"**{c['name']}**\n{c['notes']}\n\n"
+            for c in contacts_with_notes
+        )
+        logger.info(f"Sending notes for {len(contacts_with_notes)} contacts to user")
+        await reply_to(message, response, parse_mode="Markdown")
         logger.debug("Notes response sent")
     else:
         logger.info("No notes found - sending empty response")
-        await bot.reply_to(message, "Noch keine Notizen zu Kontakten gespeichert!\n\nNutze /kontakte um Kontakte von Google zu synchronisieren.")
+        await reply_to(message, NO_NOTES_TEXT)
         logger.debug("Empty notes response sent")
 
 
-@bot.message_handler(commands=['kontakt'])
 async def search_contact(message):
-    logger.info("=" * 60)
-    logger.info("/kontakt command received")
-    logger.debug(f"Chat ID: {message.chat.id}")
-    logger.debug(f"User: {message.from_user.id} ({message.from_user.username})")
-    logger.debug(f"Full message text: {message.text}")
-
     if not is_authorized(message):
         logger.warning("Unauthorized /kontakt request - ignoring")
         return
 
-    query = message.text.replace('/kontakt', '').strip()
-    logger.debug(f"Extracted search query: '{query}'")
+    # Drop the command itself, which may be addressed as /kontakt@BotName
+    parts = message.text.split(maxsplit=1)
+    query = parts[1].strip() if len(parts) > 1 else ""
+    logger.debug("Extracted search query: '%s'", query)
 
     if not query:
         logger.warning("Empty search query - sending usage instructions")
-        await bot.reply_to(message, "Nutzung: /kontakt Name")
+        await reply_to(message, KONTAKT_USAGE_TEXT)
         logger.debug("Usage instructions sent")
         return
 
     logger.info(f"Searching for contact: '{query}'")
-    from luna import contacts
-    logger.debug("Contacts module imported")
-
-    results = contacts.search_contact(query)
-    logger.debug(f"Search returned {len(results)} results")
-    logger.debug(f"Results: {results}")
+    results = await asyncio.to_thread(contacts.search_contact, query)
+    logger.debug("Search returned %s results", len(results))
+    logger.debug("Results: %s", results)
 
     if results:
-        response = "Gefunden:\n"
-        for c in results:
-            logger.debug(f"Processing contact: {c['name']}")
-            response += f"\n{c['name']}\n"
-            if c['phones']:
-                response += f"Tel: {c['phones'][0]}\n"
-                logger.debug(f"Added phone: {c['phones'][0]}")
-            if c['emails']:
-                response += f"Email: {c['emails'][0]}\n"
-                logger.debug(f"Added email: {c['emails'][0]}")
+        response = "Gefunden:\n" + "".join(
+            f"\n{c['name']}\n"
+            + (f"Tel: {c['phones'][0]}\n" if c['phones'] else "")
+            + (f"Email: {c['emails'][0]}\n" if c['emails'] else "")
+            for c in results
+        )
         logger.info(f"Sending {len(results)} contact results to user")
-        await bot.reply_to(message, response)
+        await reply_to(message, response)
         logger.debug("Contact results sent")
     else:
         logger.info(f"No contacts found for query '{query}'")
-        await bot.reply_to(message, f"Kein Kontakt '{query}' gefunden.")
+        await reply_to(message, f"Kein Kontakt '{query}' gefunden.")
         logger.debug("No results response sent")
 
 
-@bot.message_handler(commands=['kontakte'])
 async def sync_contacts(message):
     """Sync contacts from Google to local database."""
-    logger.info("=" * 60)
-    logger.info("/kontakte command received")
-    logger.debug(f"Chat ID: {message.chat.id}")
-    logger.debug(f"User: {message.from_user.id} ({message.from_user.username})")
-
     if not is_authorized(message):
         logger.warning("Unauthorized /kontakte request - ignoring")
         return
 
-    await bot.send_chat_action(message.chat.id, 'typing')
+    spawn(send_typing(message.chat.id))
 
     try:
         logger.info("Calling MCP contacts sync tool...")
-        result = await llm.call_mcp_contacts_tool("sync_contacts")
-        logger.debug(f"Sync result: {result}")
+        async with mcp_semaphore:
+            result = await llm.call_mcp_contacts_tool("sync_contacts")
+        logger.debug("Sync result: %s", result)
 
-        await bot.reply_to(message, result)
+        await reply_to(message, result)
         logger.info("Contacts sync completed")
     except Exception as e:
-        logger.error(f"Contacts sync error: {str(e)}", exc_info=True)
-        await bot.reply_to(message, f"Fehler beim Synchronisieren: {str(e)}")
+        await log_and_reply(message, "Fehler beim Synchronisieren", e)
 
 
-@bot.message_handler(commands=['clear'])
 async def clear_context(message):
     """Clear conversation history."""
-    logger.info("=" * 60)
-    logger.info("/clear command received")
-    logger.debug(f"Chat ID: {message.chat.id}")
-    logger.debug(f"User: {message.from_user.id} ({message.from_user.username})")
-
     if not is_authorized(message):
         logger.warning("Unauthorized /clear request - ignoring")
         return
 
     logger.warning("CLEARING ALL CONVERSATION HISTORY")
 
-    logger.debug(f"Opening database at: {DB_PATH}")
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-
-    logger.debug("Executing DELETE FROM conversations")
-    c.execute("DELETE FROM conversations")
-    deleted_count = c.rowcount
-    logger.info(f"Deleted {deleted_count} conversation records")
-
-    conn.commit()
-    logger.debug("Transaction committed")
-    conn.close()
-    logger.debug("Database connection closed")
+    # Blocking SQLite work runs in a worker thread so other chats aren't stalled
+    await asyncio.to_thread(memory.clear_conversations)
 
-    await bot.reply_to(message, "Konversationsverlauf gelöscht!")
+    await reply_to(message, "Konversationsverlauf gelöscht!")
     logger.info("Clear confirmation sent to user")
 
 
 async def show_contact_disambiguation(chat_id: int, disambiguation_item: dict) -> None:
     """Show inline buttons to select correct contact for a fact."""
-    import time
-
     fact = disambiguation_item["fact"]
     matches = disambiguation_item["matches"]
     contact_name = disambiguation_item["contact_name"]
 
-    # Create a hash for this pending fact
-    fact_hash = hashlib.md5(f"{fact}{time.time()}".encode()).hexdigest()[:8]
+    # Key for this pending fact - only has to be unique within this process
+    fact_hash = format(next(_pending_fact_ids), "x")
 
     # Store pending fact
+    now = time.time()
     pending_facts[fact_hash] = {
         "fact": fact,
         "matches": matches,
-        "timestamp": time.time()
+        "timestamp": now
     }
 
-    # Create inline keyboard
-    markup = InlineKeyboardMarkup()
-    for contact in matches[:5]:  # Limit to 5 options
-        org_str = f" ({contact.get('organization', '')})" if contact.get('organization') else ""
-        btn = InlineKeyboardButton(
-            text=f"{contact['name']}{org_str}",
+    # Evict expired and excess entries from the old end
+    while pending_facts and (
+        len(pending_facts) > MAX_PENDING_FACTS
+        or next(iter(pending_facts.values()))["timestamp"] < now - PENDING_FACT_TTL
+    ):
+        pending_facts.popitem(last=False)
+
+    # One button per row: up to 5 matching contacts, then cancel
+    buttons = [
+        InlineKeyboardButton(
+            text=f"{contact['name']} ({contact['organization']})" if contact.get('organization') else contact['name'],
             callback_data=f"sf:{contact['id']}:{fact_hash}"
         )
-        markup.add(btn)
-
-    # Add cancel button
-    markup.add(InlineKeyboardButton(text="Abbrechen", callback_data=f"sf:cancel:{fact_hash}"))
+        for contact in matches[:5]
+    ]
+    buttons.append(InlineKeyboardButton(text=CANCEL_BUTTON_TEXT, callback_data=f"sf:cancel:{fact_hash}"))
+    markup = InlineKeyboardMarkup(keyboard=[[button] for button in buttons])
 
-    await bot.send_message(
+    await send_message(
         chat_id,
         f"Mehrere Kontakte gefunden für '{contact_name}'.\nWelcher ist gemeint?\n\nFakt: {fact}",
         reply_markup=markup
@@ -323,14 +387,18 @@ async def show_contact_disambiguation(chat_id: int, disambiguation_item: dict) -
     logger.info(f"Sent disambiguation buttons for fact_hash {fact_hash}")
 
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("sf:"))
+def is_save_fact_callback(call) -> bool:
+    """Filter for the contact-selection buttons from show_contact_disambiguation."""
+    return call.data.startswith("sf:")
+
+
+@bot.callback_query_handler(func=is_save_fact_callback)
 async def handle_save_fact_callback(call):
     """Handle contact selection for fact saving."""
-    logger.info("=" * 60)
     logger.info("Callback query received for fact saving")
-    logger.debug(f"Callback data: {call.data}")
+    logger.debug("Callback data: %s", call.data)
 
-    parts = call.data.split(":")
+    parts = call.data.split(":", 2)
     if len(parts) != 3:
         logger.error(f"Invalid callback data format: {call.data}")
         await bot.answer_callback_query(call.id, "Fehler: Ungültiges Format")
@@ -358,7 +426,9 @@ async def handle_save_fact_callback(call):
     # Save fact to selected contact
     try:
         contact_id = int(contact_id_str)
-        success = memory.update_contact_notes(contact_id, fact_data["fact"], append=True)
+        success = await asyncio.to_thread(
+            memory.update_contact_notes, contact_id, fact_data["fact"], append=True
+        )
 
         if success:
             await bot.answer_callback_query(call.id, "Fakt gespeichert!")
@@ -374,41 +444,33 @@ async def handle_save_fact_callback(call):
         await bot.answer_callback_query(call.id, "Fehler: Ungültige Kontakt-ID")
 
 
-@bot.message_handler(func=lambda message: True)
 async def handle_text(message):
     """Handle all text messages."""
-    print(f"Chat ID: {message.chat.id}")
-    logger.info("=" * 60)
-    logger.info("Text message received")
-    logger.debug(f"Chat ID: {message.chat.id}")
-    logger.debug(f"Message ID: {message.message_id}")
-    logger.debug(f"User: {message.from_user.id} ({message.from_user.username})")
-    logger.debug(f"Message text: {message.text}")
-    logger.debug(f"Message length: {len(message.text)} characters")
-    logger.debug(f"Message date: {message.date}")
-
     if not is_authorized(message):
         logger.warning("Unauthorized text message - ignoring")
         return
 
-    logger.info("Sending 'typing' chat action...")
-    await bot.send_chat_action(message.chat.id, 'typing')
-    logger.debug("Typing indicator sent")
+    # Runs alongside the LLM call instead of delaying it by a round trip
+    spawn(send_typing(message.chat.id))
 
     try:
         # Get LLM response - LLM will fetch calendar via tools if needed
         logger.info("Calling LLM for response...")
-        logger.debug(f"User message: {message.text}")
 
-        response, needs_disambiguation = await llm.chat(message.text)
+        async with llm_semaphore:
+            response, needs_disambiguation = await llm.chat(message.text)
 
         logger.info("LLM response received")
-        logger.debug(f"Response length: {len(response)} characters")
-        logger.debug(f"Response preview: {response[:200]}..." if len(response) > 200 else f"Response: {response}")
-        logger.debug(f"Needs disambiguation: {len(needs_disambiguation)} items")
+        logger.debug("Response length: %s characters", len(response))
+        if logger.isEnabledFor(logging.DEBUG):
+            if len(response) > 200:
+                logger.debug("Response preview: %s...", response[:200])
+            else:
+                logger.debug("Response: %s", response)
+        logger.debug("Needs disambiguation: %s items", len(needs_disambiguation))
 
         logger.info("Sending response to user...")
-        await bot.reply_to(message, response)
+        await reply_to(message, response)
         logger.info("Response sent successfully")
 
         # Handle any facts that need disambiguation
@@ -417,53 +479,117 @@ async def handle_text(message):
             await show_contact_disambiguation(message.chat.id, item)
 
     except Exception as e:
-        logger.error(f"Error handling text message: {str(e)}", exc_info=True)
-        logger.error(f"Exception type: {type(e).__name__}")
-        logger.error(f"Exception args: {e.args}")
-        await bot.reply_to(message, f"Fehler: {str(e)}")
-        logger.debug("Error response sent to user")
+        await log_and_reply(message, "Fehler", e)
+
+
+# Commands, dispatched by route_message() with a single dict lookup
+COMMAND_HANDLERS = {
+    "start": send_welcome,
+    "heute": today_events,
+    "morgen": tomorrow_events,
+    "fakten": list_facts,
+    "kontakt": search_contact,
+    "kontakte": sync_contacts,
+    "clear": clear_context,
+}
+
+
+@bot.message_handler(content_types=['text'])
+async def route_message(message):
+    """Dispatch a text message to its command handler, or to handle_text."""
+    # extract_command() handles /cmd@BotName and returns None for plain text
+    command = util.extract_command(message.text)
+    handler = COMMAND_HANDLERS.get(command, handle_text)
+    # One record per incoming message instead of one per field
+    logger.debug(
+        "handler=%s chat=%s uid=%s user=%s text=%r",
+        handler.__name__, message.chat.id, message.from_user.id,
+        message.from_user.username, message.text
+    )
+    await handler(message)
 
 
 async def send_daily_summary():
     """Send daily morning summary."""
-    logger.info("=" * 60)
-    logger.info("DAILY SUMMARY TASK TRIGGERED")
-    logger.debug(f"Current time check - sending to USER_CHAT_ID: {USER_CHAT_ID}")
+    logger.info("Daily summary triggered for chat %s", USER_CHAT_ID)
 
     if not USER_CHAT_ID:
         logger.warning("USER_CHAT_ID not configured - skipping daily summary")
         return
 
     try:
-        logger.info("Fetching today's calendar events via MCP...")
-        events_text = await llm.call_mcp_tool("get_events_today")
-        logger.debug(f"MCP events result: {events_text}")
-
-        logger.info("Fetching unreminded facts...")
-        unreminded = memory.get_unreminded_facts()
-        logger.debug(f"Found {len(unreminded)} unreminded facts")
-        logger.debug(f"Unreminded facts: {unreminded}")
+        # Independent of each other, so fetch both at once
+        logger.info("Fetching today's calendar events via MCP and unreminded facts...")
+        events_text, unreminded = await asyncio.gather(
+            call_mcp_tool("get_events_today"),
+            asyncio.to_thread(memory.get_unreminded_facts, 5)
+        )
+        logger.debug("MCP events result: %s", events_text)
+        logger.debug("Found %s unreminded facts", len(unreminded))
+        logger.debug("Unreminded facts: %s", unreminded)
 
         # Format facts for summary
-        facts_str = [f"{f['contact_name'].title()}: {f['fact']}" for f in unreminded[:5]]
-        logger.debug(f"Formatted facts for summary: {facts_str}")
+        facts_str = [f"{f['display']}: {f['fact']}" for f in unreminded]
+        logger.debug("Formatted facts for summary: %s", facts_str)
 
         logger.info("Generating daily summary via LLM...")
-        summary = await llm.generate_daily_summary(events_text, facts_str)
-        logger.debug(f"Generated summary length: {len(summary)} characters")
-        logger.debug(f"Summary: {summary}")
+        async with llm_semaphore:
+            summary = await llm.generate_daily_summary(events_text, facts_str)
+        logger.debug("Generated summary length: %s characters", len(summary))
+        logger.debug("Summary: %s", summary)
 
         logger.info(f"Sending daily summary to chat {USER_CHAT_ID}...")
-        await bot.send_message(USER_CHAT_ID, f"Guten Morgen!\n\n{summary}")
+        await send_message(USER_CHAT_ID, f"Guten Morgen!\n\n{summary}")
         logger.info("Daily summary sent successfully!")
 
+    except Exception:
+        logger.exception("Daily summary error")
+
+
+def schedule_reminder(reminder_id: int, remind_at: datetime):
+    """Schedule a one-off job that delivers the reminder when it is due."""
+    scheduler.add_job(
+        deliver_reminder,
+        'date',
+        run_date=remind_at,
+        args=[reminder_id],
+        id=f"reminder-{reminder_id}",
+        replace_existing=True,
+        misfire_grace_time=None
+    )
+    logger.debug("Reminder %s scheduled for %s", reminder_id, remind_at)
+
+
+async def deliver_reminder(reminder_id: int):
+    """Send a single reminder at its due time."""
+    if not USER_CHAT_ID:
+        return
+
+    try:
+        # Claiming marks it sent, so the sweep never delivers it a second time
+        reminder = await asyncio.to_thread(memory.claim_reminder, reminder_id)
+        if reminder is None:
+            logger.debug("Reminder %s was deleted or already sent", reminder_id)
+            return
+
+        logger.info(f"Sending reminder {reminder_id}: {reminder['message']}")
+        try:
+            await send_message(USER_CHAT_ID, f"⏰ Erinnerung: {reminder['message']}")
+        except Exception:
+            # Unsent again, so the next check_reminders() sweep retries it
+            await asyncio.to_thread(memory.release_reminders, [reminder_id])
+            raise
+
     except Exception as e:
-        logger.error(f"Daily summary error: {str(e)}", exc_info=True)
-        logger.error(f"Exception type: {type(e).__name__}")
+        logger.error(f"Failed to send reminder {reminder_id}: {str(e)}", exc_info=True)
 
 
 async def check_reminders():
-    """Check for due reminders and send them."""
+    """Check for due reminders and send them.
+
+    Runs once on startup and as an infrequent sweep - reminders are normally
+    delivered on time by their own deliver_reminder() job.
+    """
     logger.debug("check_reminders() triggered")
 
     if not USER_CHAT_ID:
@@ -471,23 +597,66 @@ async def check_reminders():
         return
 
     try:
-        due_reminders = memory.get_due_reminders()
+        # Fetches and marks the due reminders in one statement; ones that a
+        # deliver_reminder() job already claimed aren't returned again
+        due_reminders = await asyncio.to_thread(memory.claim_due_reminders)
+        if not due_reminders:
+            return
 
-        for reminder in due_reminders:
+        async def send_reminder(reminder: dict):
             logger.info(f"Sending reminder {reminder['id']}: {reminder['message']}")
+            await send_message(USER_CHAT_ID, f"⏰ Erinnerung: {reminder['message']}")
 
-            await bot.send_message(
-                USER_CHAT_ID,
-                f"⏰ Erinnerung: {reminder['message']}"
-            )
+        # Send concurrently; failed sends are released and retried next check
+        results = await asyncio.gather(*map(send_reminder, due_reminders), return_exceptions=True)
+        failed_ids = []
+        for reminder, result in zip(due_reminders, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to send reminder {reminder['id']}: {result}", exc_info=result)
+                failed_ids.append(reminder['id'])
 
-            memory.mark_reminder_sent(reminder['id'])
-            logger.debug(f"Reminder {reminder['id']} marked as sent")
+        if failed_ids:
+            await asyncio.to_thread(memory.release_reminders, failed_ids)
+            logger.debug("Reminders %s released for the next check", failed_ids)
 
     except Exception as e:
         logger.error(f"Reminder check error: {str(e)}", exc_info=True)
 
 
+async def handle_webhook(request: web.Request) -> web.Response:
+    """Receive one update pushed by Telegram."""
+    if WEBHOOK_SECRET and request.headers.get("X-Telegram-Bot-Api-Secret-Token") != WEBHOOK_SECRET:
+        logger.warning("Webhook request with invalid secret token - rejecting")
+        return web.Response(status=403)
+
+    update = Update.de_json(await request.json())
+    # Acknowledge right away; Telegram retries updates that take too long
+    spawn(bot.process_new_updates([update]))
+    return web.Response()
+
+
+async def run_webhook():
+    """Register the webhook with Telegram and serve it until cancelled."""
+    app = web.Application()
+    app.router.add_post(urlparse(WEBHOOK_URL).path or "/", handle_webhook)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, WEBHOOK_LISTEN, WEBHOOK_PORT)
+    await site.start()
+    logger.info(f"Webhook server listening on {WEBHOOK_LISTEN}:{WEBHOOK_PORT}")
+
+    await bot.set_webhook(
+        url=WEBHOOK_URL, secret_token=WEBHOOK_SECRET, allowed_updates=ALLOWED_UPDATES
+    )
+    logger.info(f"Webhook registered at {WEBHOOK_URL}")
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
 async def main():
     logger.info("=" * 80)
     logger.info("MAIN FUNCTION STARTING")
@@ -503,34 +672,56 @@ async def main():
     )
     logger.debug("Daily summary job added to scheduler")
 
-    # Schedule reminder checker (every 30 seconds)
-    logger.info("Scheduling reminder check job (every 30 seconds)")
+    # Reminders get their own date job when created; the sweep catches ones
+    # that failed to send, so keep it frequent enough that a retry isn't late
+    logger.info("Scheduling reminder sweep job (every minute)")
     scheduler.add_job(
         check_reminders,
         'interval',
-        seconds=30
+        minutes=1
     )
-    logger.debug("Reminder check job added to scheduler")
+    logger.debug("Reminder sweep job added to scheduler")
+    llm.on_reminder_created = schedule_reminder
 
     logger.info("Starting scheduler...")
     scheduler.start()
     logger.info("Scheduler started successfully")
 
+    # Send what fell due while the bot was down, then schedule the rest
+    await check_reminders()
+    pending_reminders = await asyncio.to_thread(memory.get_pending_reminders)
+    for reminder in pending_reminders:
+        schedule_reminder(reminder['id'], datetime.fromisoformat(reminder['remind_at']))
+    logger.info(f"Scheduled {len(pending_reminders)} pending reminders")
+
     # Log all scheduled jobs
     jobs = scheduler.get_jobs()
-    logger.debug(f"Scheduled jobs count: {len(jobs)}")
+    logger.debug("Scheduled jobs count: %s", len(jobs))
     for job in jobs:
-        logger.debug(f"Job: {job.id} - Next run: {job.next_run_time}")
+        logger.debug("Job: %s - Next run: %s", job.id, job.next_run_time)
 
     logger.info("=" * 80)
     logger.info("Luna is running...")
     logger.info("=" * 80)
-    print("Luna is running...")
 
-    logger.info("Starting infinity polling...")
-    await bot.infinity_polling()
+    try:
+        if WEBHOOK_URL:
+            logger.info("Starting webhook server...")
+            await run_webhook()
+        else:
+            # getUpdates fails while a webhook from an earlier WEBHOOK_URL run is still set
+            await bot.delete_webhook()
+            logger.info("Starting infinity polling...")
+            await bot.infinity_polling(
+                timeout=POLLING_TIMEOUT,
+                request_timeout=POLLING_REQUEST_TIMEOUT,
+                allowed_updates=ALLOWED_UPDATES
+            )
+    finally:
+        # Don't lose the last conversation turns on shutdown
+        await llm.flush_pending_writes()
 
 
 if __name__ == "__main__":
     logger.info("Script executed directly - running main()")
-    asyncio.run(main())
+    asyncio.run(main(), loop_factory=uvloop.new_event_loop if uvloop else None)
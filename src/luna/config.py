@@ -1,5 +1,8 @@
 import os
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 from pathlib import Path
 from dotenv import load_dotenv
@@ -33,15 +36,30 @@ LOG_FORMAT = "%(asctime)s | %(levelname)-8s | %(name)-20s | %(funcName)-25s | %(
 LOG_DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 LOG_LEVEL = logging.INFO
 
-# Configure root logger
+# The real stream/file handlers run on a QueueListener thread, so logging
+# calls on the event loop only enqueue the record instead of doing I/O
+_log_formatter = logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
+_log_handlers = [
+    logging.StreamHandler(sys.stdout),
+    logging.FileHandler(DATA_DIR / "luna_debug.log", mode="a", encoding="utf-8")
+]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+
+_log_queue = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(
+    _log_queue, *_log_handlers, respect_handler_level=True
+)
+_log_listener.start()
+# Flushes whatever is still queued on shutdown
+atexit.register(_log_listener.stop)
+
+# Configure root logger - the QueueHandler only merges args into the
+# message, the listener's handlers do the actual formatting
 logging.basicConfig(
     level=LOG_LEVEL,
-    format=LOG_FORMAT,
-    datefmt=LOG_DATE_FORMAT,
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler(DATA_DIR / "luna_debug.log", mode="a", encoding="utf-8")
-    ]
+    format="%(message)s",
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
 )
 
 logging.captureWarnings(True)
@@ -66,9 +84,16 @@ logger.debug(f"CREDENTIALS_DIR: {CREDENTIALS_DIR}")
 # BOT CONFIGURATION
 # =============================================================================
 TELEGRAM_BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
-ALLOWED_USER_IDS = [int(id) for id in os.getenv("ALLOWED_USER_IDS", "").split(",") if id]
+# frozenset for O(1) membership checks on every incoming message
+ALLOWED_USER_IDS = frozenset(int(id) for id in os.getenv("ALLOWED_USER_IDS", "").split(",") if id)
 USER_CHAT_ID = int(os.getenv("USER_CHAT_ID", "0")) or None
 
+# Public HTTPS URL Telegram pushes updates to - the bot long-polls when unset
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")
+
 # =============================================================================
 # LLM CONFIGURATION
 # =============================================================================
@@ -103,6 +128,8 @@ logger.info("Configuration loaded successfully")
 logger.debug(f"TELEGRAM_BOT_TOKEN: {'*' * 10 + TELEGRAM_BOT_TOKEN[-4:] if TELEGRAM_BOT_TOKEN else 'NOT SET'}")
 logger.debug(f"ALLOWED_USER_IDS: {ALLOWED_USER_IDS}")
 logger.debug(f"USER_CHAT_ID: {USER_CHAT_ID}")
+logger.debug(f"WEBHOOK_URL: {WEBHOOK_URL or 'NOT SET (polling)'}")
+logger.debug(f"WEBHOOK_LISTEN: {WEBHOOK_LISTEN}:{WEBHOOK_PORT}")
 logger.debug(f"ANTHROPIC_API_KEY: {'*' * 10 + ANTHROPIC_API_KEY[-4:] if ANTHROPIC_API_KEY else 'NOT SET'}")
 logger.debug(f"LLM_MODEL: {LLM_MODEL}")
 logger.debug(f"GOOGLE_CREDENTIALS_PATH: {GOOGLE_CREDENTIALS_PATH} (exists: {GOOGLE_CREDENTIALS_PATH.exists()})")
@@ -1,7 +1,14 @@
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import httplib2
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 from googleapiclient.discovery import build
+from google_auth_httplib2 import AuthorizedHttp
 from luna.config import GOOGLE_CREDENTIALS_PATH, GOOGLE_TOKEN_PATH, GOOGLE_SCOPES, get_logger
 
 # =============================================================================
@@ -9,86 +16,186 @@ from luna.config import GOOGLE_CREDENTIALS_PATH, GOOGLE_TOKEN_PATH, GOOGLE_SCOPE
 # =============================================================================
 logger = get_logger("contacts")
 logger.info("Contacts module loading...")
-logger.debug(f"GOOGLE_CREDENTIALS_PATH: {GOOGLE_CREDENTIALS_PATH}")
-logger.debug(f"GOOGLE_TOKEN_PATH: {GOOGLE_TOKEN_PATH}")
-logger.debug(f"GOOGLE_SCOPES: {GOOGLE_SCOPES}")
+logger.debug("GOOGLE_CREDENTIALS_PATH: %s", GOOGLE_CREDENTIALS_PATH)
+logger.debug("GOOGLE_TOKEN_PATH: %s", GOOGLE_TOKEN_PATH)
+logger.debug("GOOGLE_SCOPES: %s", GOOGLE_SCOPES)
+
+
+# Refresh tokens a little before they expire instead of on the first failure
+REFRESH_MARGIN = timedelta(minutes=5)
+
+# Contacts change rarely - reuse the fetched list for this many seconds
+CONTACTS_CACHE_TTL = 600
+HTTP_TIMEOUT = 30
+
+# Cached for the lifetime of the bot process
+_creds: Credentials | None = None
+_people_service = None
+# Per-thread HTTP transports, see get_authorized_http()
+_thread_local = threading.local()
+# (fetched_at, contacts, lowercased names in the same order, trigram index)
+_contacts_cache: tuple[float, list[dict], list[str], dict[str, set[int]]] | None = None
+
+
+def credentials_need_refresh(creds: Credentials) -> bool:
+    """Check if credentials are invalid or expire within REFRESH_MARGIN."""
+    if not creds.valid:
+        return True
+    # google-auth stores expiry as naive UTC
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return creds.expiry is not None and creds.expiry - REFRESH_MARGIN <= now
 
 
 def get_google_credentials():
     """Get or refresh Google API credentials."""
+    global _creds
     logger.info("get_google_credentials() called")
-    creds = None
 
-    logger.debug(f"Checking if token file exists: {GOOGLE_TOKEN_PATH}")
-    if GOOGLE_TOKEN_PATH.exists():
-        logger.info(f"Token file found at {GOOGLE_TOKEN_PATH}")
+    if _creds and not credentials_need_refresh(_creds):
+        logger.debug("Returning cached credentials")
+        return _creds
+
+    creds = _creds
+
+    if creds:
+        logger.debug("Reusing cached credentials for refresh")
+    elif GOOGLE_TOKEN_PATH.exists():
+        logger.info("Token file found at %s", GOOGLE_TOKEN_PATH)
         logger.debug("Loading credentials from token file...")
         creds = Credentials.from_authorized_user_file(str(GOOGLE_TOKEN_PATH), GOOGLE_SCOPES)
-        logger.debug(f"Credentials loaded - valid: {creds.valid if creds else 'None'}")
+        logger.debug("Credentials loaded - valid: %s", creds.valid if creds else 'None')
         if creds:
-            logger.debug(f"Credentials expired: {creds.expired}")
-            logger.debug(f"Credentials has refresh_token: {bool(creds.refresh_token)}")
+            logger.debug("Credentials expired: %s", creds.expired)
+            logger.debug("Credentials has refresh_token: %s", bool(creds.refresh_token))
     else:
-        logger.warning(f"Token file not found at {GOOGLE_TOKEN_PATH}")
-
-    if not creds or not creds.valid:
-        logger.info("Credentials are missing or invalid")
-        if creds and creds.expired and creds.refresh_token:
-            logger.info("Attempting to refresh expired credentials...")
+        logger.warning("Token file not found at %s", GOOGLE_TOKEN_PATH)
+
+    # Only write token.json back if the credentials actually changed
+    creds_dirty = False
+    if not creds or credentials_need_refresh(creds):
+        logger.info("Credentials are missing, invalid or about to expire")
+        if creds and creds.refresh_token:
+            logger.info("Attempting to refresh credentials...")
             logger.debug("Calling creds.refresh(Request())...")
             creds.refresh(Request())
             logger.info("Credentials refreshed successfully")
         else:
             logger.info("Need to perform OAuth flow for new credentials")
-            logger.debug(f"Loading client secrets from {GOOGLE_CREDENTIALS_PATH}")
+            logger.debug("Loading client secrets from %s", GOOGLE_CREDENTIALS_PATH)
             flow = InstalledAppFlow.from_client_secrets_file(
                 str(GOOGLE_CREDENTIALS_PATH), GOOGLE_SCOPES
             )
             logger.info("Starting local server for OAuth flow...")
             creds = flow.run_local_server(port=0)
             logger.info("OAuth flow completed successfully")
+        creds_dirty = True
 
-        logger.info(f"Saving credentials to {GOOGLE_TOKEN_PATH}")
+    if creds_dirty:
+        logger.info("Saving credentials to %s", GOOGLE_TOKEN_PATH)
         with open(GOOGLE_TOKEN_PATH, "w") as token:
             token.write(creds.to_json())
         logger.debug("Credentials saved to token file")
 
+    _creds = creds
     logger.info("get_google_credentials() returning valid credentials")
     return creds
 
 
 def get_people_service():
     """Get Google People API service."""
+    global _people_service
+
+    # Refreshes the shared credentials in place if they expired
     creds = get_google_credentials()
-    service = build("people", "v1", credentials=creds)
-    return service
+    if _people_service is None:
+        logger.info("Building Google People API service...")
+        _people_service = build(
+            "people", "v1", credentials=creds, cache_discovery=False, static_discovery=True
+        )
+    return _people_service
+
+
+def get_authorized_http(creds: Credentials) -> AuthorizedHttp:
+    """Get this thread's authorized HTTP transport.
+
+    httplib2 is not thread-safe, so requests run from worker threads must not
+    share the cached service's built-in transport.
+    """
+    http = getattr(_thread_local, "http", None)
+    if http is None or http.credentials is not creds:
+        http = AuthorizedHttp(creds, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+        _thread_local.http = http
+    return http
+
+
+def build_trigram_index(names: list[str]) -> dict[str, set[int]]:
+    """Map every 3-character substring to the indices of the names containing it."""
+    index = defaultdict(set)
+    for i, name in enumerate(names):
+        for k in range(len(name) - 2):
+            index[name[k:k + 3]].add(i)
+    return index
+
+
+def get_cached_contacts() -> tuple[list[dict], list[str], dict[str, set[int]]]:
+    """Get all contacts, their lowercased names and a trigram index over them.
+
+    Refetched from the API after CONTACTS_CACHE_TTL.
+    """
+    global _contacts_cache
+
+    if _contacts_cache and time.monotonic() - _contacts_cache[0] < CONTACTS_CACHE_TTL:
+        logger.debug("Returning cached contacts")
+        return _contacts_cache[1:]
+
+    contacts = fetch_all_contacts()
+    names_lower = [c["name"].lower() for c in contacts]
+    _contacts_cache = (time.monotonic(), contacts, names_lower, build_trigram_index(names_lower))
+    return _contacts_cache[1:]
 
 
 def get_all_contacts() -> list[dict]:
     """Get all contacts with names and basic info."""
     logger.info("get_all_contacts() called")
+    return get_cached_contacts()[0]
+
+
+def fetch_all_contacts() -> list[dict]:
+    """Fetch all contacts with names and basic info from the People API."""
+    logger.info("fetch_all_contacts() called")
     service = get_people_service()
+    http = get_authorized_http(get_google_credentials())
 
     logger.info("Fetching contacts from Google People API...")
 
-    results = service.people().connections().list(
-        resourceName="people/me",
-        pageSize=1000,
-        personFields="names,emailAddresses,phoneNumbers,organizations"
-    ).execute()
-
-    connections = results.get("connections", [])
-    logger.info(f"Retrieved {len(connections)} connections from API")
+    connections = []
+    page_token = None
+    while True:
+        results = service.people().connections().list(
+            resourceName="people/me",
+            pageSize=1000,
+            personFields="names,emailAddresses,phoneNumbers,organizations",
+            fields="connections(names/displayName,emailAddresses/value,phoneNumbers/value,organizations/name),nextPageToken",
+            pageToken=page_token
+        ).execute(http=http)
+
+        connections.extend(results.get("connections", []))
+        page_token = results.get("nextPageToken")
+        logger.debug("Fetched page with %s connections (more: %s)", len(results.get('connections', [])), bool(page_token))
+        if not page_token:
+            break
+
+    logger.info("Retrieved %s connections from API", len(connections))
 
     contacts = []
     for i, person in enumerate(connections):
-        logger.debug(f"Processing person {i+1}/{len(connections)}")
+        logger.debug("Processing person %s/%s", i+1, len(connections))
         names = person.get("names", [])
-        logger.debug(f"Person has {len(names)} names")
+        logger.debug("Person has %s names", len(names))
 
         if names:
             display_name = names[0].get("displayName", "")
-            logger.debug(f"Display name: {display_name}")
+            logger.debug("Display name: %s", display_name)
 
             contact = {
                 "name": display_name,
@@ -97,39 +204,46 @@ def get_all_contacts() -> list[dict]:
                 "organization": None
             }
 
-            logger.debug(f"Emails: {contact['emails']}")
-            logger.debug(f"Phones: {contact['phones']}")
+            logger.debug("Emails: %s", contact['emails'])
+            logger.debug("Phones: %s", contact['phones'])
 
             orgs = person.get("organizations", [])
             if orgs:
                 contact["organization"] = orgs[0].get("name")
-                logger.debug(f"Organization: {contact['organization']}")
+                logger.debug("Organization: %s", contact['organization'])
 
             contacts.append(contact)
-            logger.debug(f"Added contact: {display_name}")
+            logger.debug("Added contact: %s", display_name)
         else:
-            logger.debug(f"Skipping person {i+1} - no names found")
+            logger.debug("Skipping person %s - no names found", i+1)
 
-    logger.info(f"get_all_contacts() returning {len(contacts)} contacts")
+    logger.info("fetch_all_contacts() returning %s contacts", len(contacts))
     return contacts
 
 
 def search_contact(name: str) -> list[dict]:
     """Search for contacts by name."""
-    logger.info(f"search_contact() called with name='{name}'")
+    logger.info("search_contact() called with name='%s'", name)
     logger.debug("Fetching all contacts for search...")
 
-    contacts = get_all_contacts()
-    logger.debug(f"Got {len(contacts)} contacts to search through")
+    contacts, names_lower, trigrams = get_cached_contacts()
+    logger.debug("Got %s contacts to search through", len(contacts))
 
     name_lower = name.lower()
-    logger.debug(f"Searching for (lowercase): '{name_lower}'")
-
-    results = [c for c in contacts if name_lower in c["name"].lower()]
+    logger.debug("Searching for (lowercase): '%s'", name_lower)
+
+    if len(name_lower) >= 3:
+        # Only names containing every trigram of the query can match
+        candidates = set.intersection(*(
+            trigrams.get(name_lower[k:k + 3], set()) for k in range(len(name_lower) - 2)
+        ))
+        results = [contacts[i] for i in sorted(candidates) if name_lower in names_lower[i]]
+    else:
+        results = [c for c, n in zip(contacts, names_lower) if name_lower in n]
 
-    logger.info(f"search_contact() found {len(results)} matches for '{name}'")
+    logger.info("search_contact() found %s matches for '%s'", len(results), name)
     for r in results:
-        logger.debug(f"Match: {r['name']}")
+        logger.debug("Match: %s", r['name'])
 
     return results
 
@@ -142,7 +256,7 @@ def get_contact_names() -> list[str]:
     contacts = get_all_contacts()
     names = [c["name"] for c in contacts]
 
-    logger.info(f"get_contact_names() returning {len(names)} names")
-    logger.debug(f"First 10 names: {names[:10]}")
+    logger.info("get_contact_names() returning %s names", len(names))
+    logger.debug("First 10 names: %s", names[:10])
 
     return names
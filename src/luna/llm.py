@@ -1,10 +1,22 @@
 import anthropic
+import anyio
+import asyncio
+import functools
+import hashlib
+import httpx
+import json
+import logging
 import re
+import time
+from bisect import bisect_right
+from collections.abc import Callable
 from datetime import datetime
+from itertools import islice
 from zoneinfo import ZoneInfo
 
-from mcp import ClientSession, StdioServerParameters
+from mcp import ClientSession, McpError, StdioServerParameters
 from mcp.client.stdio import stdio_client
+from mcp.types import CONNECTION_CLOSED
 
 from luna.config import (
     ANTHROPIC_API_KEY, LLM_MODEL, MCP_CALENDAR_DIR, MCP_CONTACTS_DIR,
@@ -21,13 +33,30 @@ logger.debug(f"ANTHROPIC_API_KEY: {'*' * 10 + ANTHROPIC_API_KEY[-4:] if ANTHROPI
 logger.debug(f"LLM_MODEL: {LLM_MODEL}")
 
 logger.info("Initializing Anthropic client...")
-client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+# Keep idle connections for a minute instead of httpx's 5 seconds, so the
+# next message usually reuses a warm TLS connection
+client = anthropic.AsyncAnthropic(
+    api_key=ANTHROPIC_API_KEY,
+    http_client=anthropic.DefaultAsyncHttpxClient(
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=60)
+    )
+)
 logger.info("Anthropic client initialized successfully")
 
+# Vienna timezone and German weekday/month names for times shown to the LLM
+TIMEZONE = ZoneInfo("Europe/Vienna")
+WEEKDAYS_DE = ["Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag", "Samstag", "Sonntag"]
+MONTHS_DE = ["", "Januar", "Februar", "März", "April", "Mai", "Juni",
+             "Juli", "August", "September", "Oktober", "November", "Dezember"]
+
+# Set by the bot to schedule delivery of newly created reminders
+on_reminder_created: Callable[[int, datetime], None] | None = None
+
 # =============================================================================
 # CALENDAR TOOLS FOR ANTHROPIC API
 # =============================================================================
-CALENDAR_TOOLS = [
+# A tuple, since the same definitions are sent unchanged with every request
+CALENDAR_TOOLS = (
     {
         "name": "get_events_today",
         "description": "Holt alle Kalender-Events für heute. Nutze dieses Tool wenn der User nach heutigen Terminen fragt.",
@@ -55,6 +84,10 @@ CALENDAR_TOOLS = [
                 "days": {
                     "type": "integer",
                     "description": "Anzahl der Tage in die Zukunft (Standard: 7)"
+                },
+                "max_results": {
+                    "type": "integer",
+                    "description": "Maximale Anzahl Termine (Standard: 20)"
                 }
             },
             "required": []
@@ -69,6 +102,10 @@ CALENDAR_TOOLS = [
                 "date": {
                     "type": "string",
                     "description": "Datum im Format YYYY-MM-DD"
+                },
+                "max_results": {
+                    "type": "integer",
+                    "description": "Maximale Anzahl Termine (Standard: 20)"
                 }
             },
             "required": ["date"]
@@ -126,7 +163,128 @@ CALENDAR_TOOLS = [
             "required": ["message", "remind_at"]
         }
     }
-]
+)
+
+
+# Tools with side effects - a call that failed mid-flight may already have
+# been executed, so they are never retried automatically
+MUTATING_MCP_TOOLS = {"create_event", "update_contact_notes", "sync_contacts"}
+
+
+def is_mcp_connection_error(error: Exception) -> bool:
+    """Check if an MCP call failed because the server connection is gone."""
+    if isinstance(error, McpError):
+        return error.error.code == CONNECTION_CLOSED
+    return isinstance(error, (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream, OSError))
+
+
+class MCPPool:
+    """A long-lived session to one MCP server, opened on first use.
+
+    The stdio transport and ClientSession are owned by a background task, so
+    their context managers are entered and exited in the same task and the
+    server process is shut down when that task is cancelled at exit.
+    """
+
+    def __init__(self, name: str, server_params: StdioServerParameters):
+        self.name = name
+        self.server_params = server_params
+        self._lock = asyncio.Lock()
+        self._session: ClientSession | None = None
+        self._task: asyncio.Task | None = None
+        self._stop: asyncio.Event | None = None
+
+    async def get(self) -> ClientSession:
+        """Return the open session, starting the server if needed."""
+        async with self._lock:
+            if self._session is None:
+                logger.info(f"Starting MCP {self.name} server...")
+                ready = asyncio.get_running_loop().create_future()
+                self._stop = asyncio.Event()
+                self._task = asyncio.create_task(self._run(ready))
+                self._session = await ready
+                logger.info(f"MCP {self.name} session initialized")
+            return self._session
+
+    async def _run(self, ready: asyncio.Future) -> None:
+        try:
+            async with stdio_client(self.server_params) as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    ready.set_result(session)
+                    await self._stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.error(f"MCP {self.name} session failed: {e}", exc_info=True)
+        finally:
+            self._session = None
+
+    async def close(self, session: ClientSession | None = None) -> None:
+        """Shut the server down; the next get() starts a fresh one.
+
+        If session is given, only close if it is still the current one, so
+        concurrent callers that saw the same failure don't kill its replacement.
+        """
+        async with self._lock:
+            if session is not None and session is not self._session:
+                return
+            task, self._task = self._task, None
+            self._session = None
+            if task:
+                self._stop.set()
+                await asyncio.gather(task, return_exceptions=True)
+
+    async def call_tool(self, tool_name: str, arguments: dict):
+        """Call a tool, reopening the session if the connection is gone.
+
+        Read-only tools are retried once on the fresh session.
+        """
+        session = await self.get()
+        try:
+            return await session.call_tool(tool_name, arguments)
+        except Exception as e:
+            if not is_mcp_connection_error(e):
+                raise
+            logger.warning(f"MCP {self.name} connection lost ({e!r}) - reconnecting")
+            await self.close(session)
+            if tool_name in MUTATING_MCP_TOOLS:
+                raise
+        return await (await self.get()).call_tool(tool_name, arguments)
+
+
+calendar_pool = MCPPool("Calendar", StdioServerParameters(
+    command="uv",
+    args=["run", "mcp-google-calendar"],
+    cwd=str(MCP_CALENDAR_DIR),
+    env={
+        "GOOGLE_CREDENTIALS_PATH": str(GOOGLE_CREDENTIALS_PATH),
+        "GOOGLE_TOKEN_PATH": str(GOOGLE_TOKEN_PATH),
+    }
+))
+
+contacts_pool = MCPPool("Contacts", StdioServerParameters(
+    command="uv",
+    args=["run", "mcp-google-contacts"],
+    cwd=str(MCP_CONTACTS_DIR),
+    env={
+        "GOOGLE_CREDENTIALS_PATH": str(GOOGLE_CREDENTIALS_PATH),
+        "GOOGLE_TOKEN_PATH": str(GOOGLE_TOKEN_PATH),
+        "LUNA_DB_PATH": str(DB_PATH),
+    }
+))
+
+
+# Read-only calendar tools and how many seconds their results are reused
+MCP_CACHE_TTLS = {
+    "get_events_today": 300,
+    "get_events_tomorrow": 600,
+    "get_upcoming_events": 300,
+    "get_events_for_date": 900,
+}
+# {(tool_name, arguments as JSON, local date): (fetched_at, result)}
+_mcp_cache: dict[tuple[str, str, str], tuple[float, str]] = {}
 
 
 async def call_mcp_tool(tool_name: str, arguments: dict = None) -> str:
@@ -136,31 +294,35 @@ async def call_mcp_tool(tool_name: str, arguments: dict = None) -> str:
     if arguments is None:
         arguments = {}
 
-    server_params = StdioServerParameters(
-        command="uv",
-        args=["run", "mcp-google-calendar"],
-        cwd=str(MCP_CALENDAR_DIR),
-        env={
-            "GOOGLE_CREDENTIALS_PATH": str(GOOGLE_CREDENTIALS_PATH),
-            "GOOGLE_TOKEN_PATH": str(GOOGLE_TOKEN_PATH),
-        }
-    )
+    # The date is part of the key so "today" and "tomorrow" roll over at midnight
+    ttl = MCP_CACHE_TTLS.get(tool_name)
+    cache_key = (tool_name, json.dumps(arguments, sort_keys=True), datetime.now(TIMEZONE).date().isoformat())
+    if ttl:
+        cached = _mcp_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < ttl:
+            logger.info(f"Returning cached result for {tool_name}")
+            return cached[1]
 
     try:
-        async with stdio_client(server_params) as (read, write):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                logger.info(f"MCP session initialized, calling tool: {tool_name}")
-
-                result = await session.call_tool(tool_name, arguments)
-
-                if result.content:
-                    text_result = result.content[0].text
-                    logger.info(f"MCP tool result: {text_result[:100]}...")
-                    return text_result
-                else:
-                    logger.warning("MCP tool returned no content")
-                    return "Keine Ergebnisse."
+        result = await calendar_pool.call_tool(tool_name, arguments)
+        if not ttl:
+            # Anything else may have changed the calendar, so cached reads are stale
+            _mcp_cache.clear()
+
+        if result.content:
+            text_result = result.content[0].text
+            logger.info(f"MCP tool result: {text_result[:100]}...")
+            if ttl and not result.isError:
+                now = time.monotonic()
+                # Drop expired entries and ones from earlier days, which can never hit again
+                for key, (fetched_at, _) in list(_mcp_cache.items()):
+                    if key[2] != cache_key[2] or now - fetched_at >= MCP_CACHE_TTLS[key[0]]:
+                        del _mcp_cache[key]
+                _mcp_cache[cache_key] = (now, text_result)
+            return text_result
+        else:
+            logger.warning("MCP tool returned no content")
+            return "Keine Ergebnisse."
     except Exception as e:
         logger.error(f"MCP tool call failed: {e}", exc_info=True)
         return f"Fehler beim Abrufen der Kalenderdaten: {str(e)}"
@@ -173,32 +335,18 @@ async def call_mcp_contacts_tool(tool_name: str, arguments: dict = None) -> str:
     if arguments is None:
         arguments = {}
 
-    server_params = StdioServerParameters(
-        command="uv",
-        args=["run", "mcp-google-contacts"],
-        cwd=str(MCP_CONTACTS_DIR),
-        env={
-            "GOOGLE_CREDENTIALS_PATH": str(GOOGLE_CREDENTIALS_PATH),
-            "GOOGLE_TOKEN_PATH": str(GOOGLE_TOKEN_PATH),
-            "LUNA_DB_PATH": str(DB_PATH),
-        }
-    )
-
     try:
-        async with stdio_client(server_params) as (read, write):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                logger.info(f"MCP Contacts session initialized, calling tool: {tool_name}")
-
-                result = await session.call_tool(tool_name, arguments)
-
-                if result.content:
-                    text_result = result.content[0].text
-                    logger.info(f"MCP Contacts tool result: {text_result[:100]}...")
-                    return text_result
-                else:
-                    logger.warning("MCP Contacts tool returned no content")
-                    return "Keine Ergebnisse."
+        result = await contacts_pool.call_tool(tool_name, arguments)
+        # The server writes the contacts table from its own process
+        memory.invalidate_local_contacts_cache()
+
+        if result.content:
+            text_result = result.content[0].text
+            logger.info(f"MCP Contacts tool result: {text_result[:100]}...")
+            return text_result
+        else:
+            logger.warning("MCP Contacts tool returned no content")
+            return "Keine Ergebnisse."
     except Exception as e:
         logger.error(f"MCP Contacts tool call failed: {e}", exc_info=True)
         return f"Fehler beim Abrufen der Kontaktdaten: {str(e)}"
@@ -219,12 +367,13 @@ async def handle_create_reminder(arguments: dict) -> str:
         remind_at = datetime.fromisoformat(remind_at_str)
 
         # Add timezone if not present
-        TIMEZONE = ZoneInfo("Europe/Vienna")
         if remind_at.tzinfo is None:
             remind_at = remind_at.replace(tzinfo=TIMEZONE)
 
         # Create the reminder
-        reminder_id = memory.add_reminder(message, remind_at)
+        reminder_id = await asyncio.to_thread(memory.add_reminder, message, remind_at)
+        if on_reminder_created:
+            on_reminder_created(reminder_id, remind_at)
 
         # Format for user
         remind_at_local = remind_at.astimezone(TIMEZONE)
@@ -240,6 +389,14 @@ async def handle_create_reminder(arguments: dict) -> str:
         return f"Fehler beim Erstellen der Erinnerung: {str(e)}"
 
 
+async def call_tool(tool_name: str, tool_input: dict) -> str:
+    """Run a tool requested by the model."""
+    # Handle reminder tool locally, others via MCP
+    if tool_name == "create_reminder":
+        return await handle_create_reminder(tool_input)
+    return await call_mcp_tool(tool_name, tool_input)
+
+
 SYSTEM_PROMPT = """Du bist Luna, persönliche Assistentin von Markus. Antworte immer auf Deutsch.
 
 Stil: Direkt, locker, keine Floskeln. Max 1-2 Sätze. Komm sofort zum Punkt.
@@ -260,6 +417,36 @@ Nutze gespeicherte Infos wenn relevant."""
 
 logger.debug(f"System prompt loaded ({len(SYSTEM_PROMPT)} characters)")
 
+# System prompt with a cache breakpoint, so tools and system prompt are
+# read from Anthropic's prompt cache instead of reprocessed on every call
+SYSTEM_BLOCKS = [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+
+# Common words that are never names but would match inside many of them
+# ("ich" in "Richard"), skipped when looking for contacts in a message
+GERMAN_STOPWORDS = frozenset({
+    "ab", "am", "an", "auch", "auf", "aus", "bei", "bin", "bis", "bitte", "da", "dann",
+    "das", "dass", "dem", "den", "der", "des", "die", "dir", "du", "ein", "eine", "einen",
+    "er", "es", "für", "hab", "habe", "hat", "heute", "ich", "ihr", "im", "in", "ist",
+    "ja", "mich", "mir", "mit", "morgen", "nach", "nicht", "noch", "nur", "oder", "sie",
+    "sind", "so", "um", "und", "uns", "vom", "von", "vor", "was", "wann", "war", "wer",
+    "wie", "wir", "wo", "zu", "zum", "zur",
+})
+
+# Upper bound on the characters of conversation history sent with each message
+HISTORY_MAX_CHARS = 6000
+
+# [SAVE_FACT|Name|Fakt] tags the model adds to its response, see SYSTEM_PROMPT
+SAVE_FACT_RE = re.compile(r'\[SAVE_FACT\|([^|]+)\|([^\]]+)\]')
+
+
+@functools.lru_cache(maxsize=1)
+def format_local_time(epoch_minute: int) -> str:
+    """Format a minute since the epoch as German Vienna local time."""
+    now = datetime.fromtimestamp(epoch_minute * 60, TIMEZONE)
+    weekday = WEEKDAYS_DE[now.weekday()]
+    month = MONTHS_DE[now.month]
+    return f"{weekday}, {now.day}. {month} {now.year}, {now.strftime('%H:%M')} Uhr (Wien)"
+
 
 def build_context(user_message: str, calendar_events: list = None) -> str:
     """Build context string for the LLM using local contacts from database."""
@@ -267,77 +454,72 @@ def build_context(user_message: str, calendar_events: list = None) -> str:
 
     context_parts = []
 
-    # Use Vienna timezone and German weekday/month names
-    TIMEZONE = ZoneInfo("Europe/Vienna")
-    now = datetime.now(TIMEZONE)
-
-    weekdays_de = ["Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag", "Samstag", "Sonntag"]
-    months_de = ["", "Januar", "Februar", "März", "April", "Mai", "Juni",
-                 "Juli", "August", "September", "Oktober", "November", "Dezember"]
-
-    weekday = weekdays_de[now.weekday()]
-    month = months_de[now.month]
-    time_str = f"{weekday}, {now.day}. {month} {now.year}, {now.strftime('%H:%M')} Uhr (Wien)"
+    time_str = format_local_time(int(time.time()) // 60)
     context_parts.append(f"Aktuelle Zeit: {time_str}")
-    logger.debug(f"Added current time to context: {time_str}")
+    logger.debug("Added current time to context: %s", time_str)
 
     if calendar_events:
         context_parts.append("\nKalender-Events:")
-        for event in calendar_events[:10]:
-            context_parts.append(f"- {event}")
-            logger.debug(f"Added calendar event to context: {event}")
+        context_parts.extend(f"- {event}" for event in islice(calendar_events, 10))
         logger.info(f"Added {min(len(calendar_events), 10)} calendar events to context")
 
-    # Load contacts from local database
-    logger.info("Loading contacts from local database...")
-    all_contacts = memory.get_all_local_contacts()
-    logger.debug(f"Loaded {len(all_contacts)} contacts from local DB")
-
     logger.info("Extracting potential names from user message...")
-    potential_names = user_message.split(" ")
-    logger.debug(f"Potential names: {potential_names}")
-
-    matched_contacts = []
-    contacts_with_notes = []
-
-    logger.info(f"Processing {len(potential_names)} potential contact names...")
-    for name in potential_names:
-        if len(name) < 2:  # Skip very short words
-            continue
-        logger.debug(f"Processing name: {name}")
-
-        # Match against local contacts
-        for contact in all_contacts:
-            if name.lower() in contact['name'].lower():
-                contact_info = f"{contact['name']}"
-                if contact.get('organization'):
-                    contact_info += f" ({contact['organization']})"
-                if contact_info not in matched_contacts:
-                    matched_contacts.append(contact_info)
-                    logger.debug(f"Matched contact: {contact_info}")
-
-                    # If contact has notes, include them
-                    if contact.get('notes'):
-                        contacts_with_notes.append({
-                            "name": contact['name'],
-                            "notes": contact['notes']
-                        })
+    # Lowercase once and split on punctuation too, so "Julia," still matches
+    potential_names = {
+        w for w in re.findall(r"\w+", user_message.lower())
+        if len(w) >= 2 and w not in GERMAN_STOPWORDS
+    }
+    logger.debug("Potential names: %s", potential_names)
+
+    # Dicts as ordered sets: {contact info: None} and {name: notes}
+    matched_contacts = {}
+    contacts_with_notes = {}
+
+    # Nothing that could name a contact - skip loading and scanning contacts
+    if potential_names:
+        # Load contacts from local database
+        logger.info("Loading contacts from local database...")
+        all_contacts, name_corpus, name_offsets = memory.get_cached_local_contacts()
+        logger.debug("Loaded %s contacts from local DB", len(all_contacts))
+
+        logger.info(f"Processing {len(potential_names)} potential contact names...")
+        # Every word matches any contact whose name contains it, so "anna"
+        # also finds "Hannah" and "müller" finds "Müller-Schmidt"
+        matched_ids = set()
+        for name in potential_names:
+            pos = name_corpus.find(name)
+            while pos != -1:
+                i = bisect_right(name_offsets, pos) - 1
+                matched_ids.add(i)
+                # Continue after this contact's name
+                pos = name_corpus.find(name, name_offsets[i + 1])
+
+        for i in sorted(matched_ids):
+            contact = all_contacts[i]
+            contact_info = f"{contact['name']}"
+            if contact.get('organization'):
+                contact_info += f" ({contact['organization']})"
+            if contact_info not in matched_contacts:
+                matched_contacts[contact_info] = None
+                logger.debug("Matched contact: %s", contact_info)
+
+                # If contact has notes, include them
+                if contact.get('notes'):
+                    contacts_with_notes.setdefault(contact['name'], contact['notes'])
 
     if matched_contacts:
         context_parts.append("\nErkannte Kontakte:")
-        for c in matched_contacts:
-            context_parts.append(f"- {c}")
+        context_parts.extend(f"- {c}" for c in matched_contacts)
         logger.info(f"Added {len(matched_contacts)} matched contacts to context")
 
     if contacts_with_notes:
         context_parts.append("\nGespeicherte Notizen zu Kontakten:")
-        for c in contacts_with_notes:
-            context_parts.append(f"- {c['name']}: {c['notes']}")
+        context_parts.extend(f"- {name}: {notes}" for name, notes in contacts_with_notes.items())
         logger.info(f"Added notes for {len(contacts_with_notes)} contacts to context")
 
     context = "\n".join(context_parts)
     logger.info(f"build_context() complete - {len(context)} characters")
-    logger.debug(f"Full context:\n{context}")
+    logger.debug("Full context:\n%s", context)
 
     return context
 
@@ -345,23 +527,39 @@ def build_context(user_message: str, calendar_events: list = None) -> str:
 def parse_save_facts(response: str) -> tuple[str, list[tuple[str, str]]]:
     """Extract SAVE_FACT commands from response and return clean response."""
     logger.info("parse_save_facts() called")
-    logger.debug(f"Response length: {len(response)} characters")
-    logger.debug(f"Response: {response[:200]}..." if len(response) > 200 else f"Response: {response}")
-
-    facts = []
-    pattern = r'\[SAVE_FACT\|([^|]+)\|([^\]]+)\]'
-
-    matches = re.findall(pattern, response)
-    logger.debug(f"Found {len(matches)} SAVE_FACT patterns")
+    logger.debug("Response length: %s characters", len(response))
+    if logger.isEnabledFor(logging.DEBUG):
+        if len(response) > 200:
+            logger.debug("Response: %s...", response[:200])
+        else:
+            logger.debug("Response: %s", response)
 
-    for contact, fact in matches:
-        facts.append((contact.strip(), fact.strip()))
-        logger.info(f"Extracted fact - Contact: {contact.strip()}, Fact: {fact.strip()}")
+    # Most responses contain no SAVE_FACT at all
+    if "[SAVE_FACT|" not in response:
+        logger.debug("No SAVE_FACT patterns found")
+        return response.strip(), []
 
-    # Remove the SAVE_FACT tags from response
-    clean_response = re.sub(pattern, '', response).strip()
-    logger.debug(f"Clean response length: {len(clean_response)} characters")
-    logger.debug(f"Clean response: {clean_response[:200]}..." if len(clean_response) > 200 else f"Clean response: {clean_response}")
+    # One scan: collect the facts and the text between the SAVE_FACT tags
+    facts = []
+    parts = []
+    last_end = 0
+    for m in SAVE_FACT_RE.finditer(response):
+        facts.append((m.group(1).strip(), m.group(2).strip()))
+        parts.append(response[last_end:m.start()])
+        last_end = m.end()
+    parts.append(response[last_end:])
+    logger.debug("Found %s SAVE_FACT patterns", len(facts))
+
+    for contact, fact in facts:
+        logger.info(f"Extracted fact - Contact: {contact}, Fact: {fact}")
+
+    clean_response = "".join(parts).strip()
+    logger.debug("Clean response length: %s characters", len(clean_response))
+    if logger.isEnabledFor(logging.DEBUG):
+        if len(clean_response) > 200:
+            logger.debug("Clean response: %s...", clean_response[:200])
+        else:
+            logger.debug("Clean response: %s", clean_response)
 
     logger.info(f"parse_save_facts() returning {len(facts)} facts")
     return clean_response, facts
@@ -371,7 +569,7 @@ def find_matching_contacts(contact_name: str) -> list[dict]:
     """Find contacts matching a name. Returns list of matching contacts."""
     logger.info(f"find_matching_contacts() called for '{contact_name}'")
     matches = memory.search_contacts_by_name(contact_name)
-    logger.debug(f"Found {len(matches)} matching contacts")
+    logger.debug("Found %s matching contacts", len(matches))
     return matches
 
 
@@ -388,8 +586,13 @@ def process_facts_for_saving(facts: list[tuple[str, str]]) -> tuple[list[dict],
     auto_save = []
     needs_disambiguation = []
 
+    # Several facts are often about the same person - look each name up once
+    matches_by_name = {}
+
     for contact_name, fact in facts:
-        matches = find_matching_contacts(contact_name)
+        if contact_name not in matches_by_name:
+            matches_by_name[contact_name] = find_matching_contacts(contact_name)
+        matches = matches_by_name[contact_name]
 
         if len(matches) == 0:
             logger.warning(f"No contact found for '{contact_name}' - skipping fact")
@@ -415,6 +618,35 @@ def process_facts_for_saving(facts: list[tuple[str, str]]) -> tuple[list[dict],
     return auto_save, needs_disambiguation
 
 
+# Turns still being written to the database - the event loop only keeps weak
+# references to tasks, so they are held here until they finish
+pending_writes: set[asyncio.Task] = set()
+
+
+async def persist_turn(user_message: str, clean_response: str, auto_save: list[dict]):
+    """Store a chat turn and its auto-saved facts; failures are only logged."""
+    try:
+        await asyncio.to_thread(
+            memory.write_turn,
+            user_message,
+            clean_response,
+            [(item['contact_id'], item['fact']) for item in auto_save]
+        )
+    except Exception as e:
+        logger.error(f"Failed to save conversation: {e}", exc_info=True)
+        return
+    for item in auto_save:
+        logger.info(f"Fact saved for {item['contact_name']}")
+    logger.info("Conversation saved successfully")
+
+
+async def flush_pending_writes():
+    """Wait until all turns handed to persist_turn() are stored."""
+    if pending_writes:
+        logger.info(f"Waiting for {len(pending_writes)} pending conversation writes...")
+        await asyncio.wait(pending_writes)
+
+
 async def chat(user_message: str, calendar_events: list = None) -> tuple[str, list[dict]]:
     """
     Send a message to Claude and get a response.
@@ -427,26 +659,48 @@ async def chat(user_message: str, calendar_events: list = None) -> tuple[str, li
     logger.info("=" * 60)
     logger.info("chat() called")
 
-    # Build context using local contacts from database
-    logger.info("Building context for LLM...")
-    context = build_context(user_message, None)
-    logger.debug(f"Context built ({len(context)} characters)")
-
-    # Get conversation history
-    logger.info("Fetching conversation history...")
-    history = memory.get_recent_conversations(limit=10)
-    logger.debug(f"Retrieved {len(history)} conversation messages")
+    # Build context using local contacts from database and fetch the
+    # conversation history - both read SQLite, so run them side by side
+    # in worker threads
+    logger.info("Building context and fetching conversation history...")
+    # The previous turn may still be on its way to the database
+    await flush_pending_writes()
+    context, history = await asyncio.gather(
+        asyncio.to_thread(build_context, user_message, None),
+        asyncio.to_thread(memory.get_recent_conversations, limit=10)
+    )
+    logger.debug("Context built (%s characters)", len(context))
+    logger.debug("Retrieved %s conversation messages", len(history))
 
-    # Build messages
+    # Build messages, keeping only as much recent history as fits the budget
     logger.info("Building messages array for API call...")
     messages = []
-    for msg in history:
+    history_chars = 0
+    for msg in reversed(history):
+        history_chars += len(msg["content"])
+        if history_chars > HISTORY_MAX_CHARS:
+            logger.debug("History budget reached - dropping older messages")
+            break
         messages.append({"role": msg["role"], "content": msg["content"]})
-        logger.debug(f"Added history message: {msg['role']}")
+        logger.debug("Added history message: %s", msg['role'])
+    messages.reverse()
+    # The conversation sent to the API has to start with a user message
+    while messages and messages[0]["role"] != "user":
+        messages.pop(0)
+    # Cache breakpoint at the end of the history: the next turn resends the
+    # same prefix and can read it from the prompt cache
+    if messages:
+        messages[-1]["content"] = [
+            {"type": "text", "text": messages[-1]["content"], "cache_control": {"type": "ephemeral"}}
+        ]
 
     user_content = f"{user_message}\n\n[Kontext: {context}]"
-    messages.append({"role": "user", "content": user_content})
-    logger.debug(f"Added current user message ({len(user_content)} characters)")
+    # Cache breakpoint: later iterations of the tool use loop below reuse
+    # everything up to and including this message from the prompt cache
+    messages.append({"role": "user", "content": [
+        {"type": "text", "text": user_content, "cache_control": {"type": "ephemeral"}}
+    ]})
+    logger.debug("Added current user message (%s characters)", len(user_content))
     logger.info(f"Total messages for API: {len(messages)}")
 
     # Tool use loop - keep calling until we get a final text response
@@ -458,10 +712,10 @@ async def chat(user_message: str, calendar_events: list = None) -> tuple[str, li
         logger.info(f"API call iteration {iteration}")
 
         # Call Claude with tools
-        response = client.messages.create(
+        response = await client.messages.create(
             model=LLM_MODEL,
             max_tokens=1024,
-            system=SYSTEM_PROMPT,
+            system=SYSTEM_BLOCKS,
             tools=CALENDAR_TOOLS,
             messages=messages
         )
@@ -470,32 +724,35 @@ async def chat(user_message: str, calendar_events: list = None) -> tuple[str, li
 
         # Check if we need to handle tool use
         if response.stop_reason == "tool_use":
-            # Process all tool calls in the response
+            # Run all tool calls of the response concurrently; gather keeps
+            # the results in the order of the tool_use blocks
+            tool_blocks = [block for block in response.content if block.type == "tool_use"]
+            for block in tool_blocks:
+                logger.info(f"Tool call requested: {block.name} with input {block.input}")
+
+            results = await asyncio.gather(*(
+                call_tool(block.name, block.input) for block in tool_blocks
+            ), return_exceptions=True)
+
+            # A failing tool is reported to the model as an error result for
+            # its tool_use_id instead of aborting the whole turn
             tool_results = []
-
-            for content_block in response.content:
-                if content_block.type == "tool_use":
-                    tool_name = content_block.name
-                    tool_input = content_block.input
-                    tool_use_id = content_block.id
-
-                    logger.info(f"Tool call requested: {tool_name} with input {tool_input}")
-
-                    # Handle reminder tool locally, others via MCP
-                    if tool_name == "create_reminder":
-                        result = await handle_create_reminder(tool_input)
-                    else:
-                        # Call the MCP server
-                        result = await call_mcp_tool(tool_name, tool_input)
-
+            for block, result in zip(tool_blocks, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Tool {block.name} failed: {result}", exc_info=result)
                     tool_results.append({
                         "type": "tool_result",
-                        "tool_use_id": tool_use_id,
-                        "content": result
+                        "tool_use_id": block.id,
+                        "content": f"Fehler bei {block.name}: {result}",
+                        "is_error": True
                     })
+                else:
+                    tool_results.append({"type": "tool_result", "tool_use_id": block.id, "content": result})
 
             # Add assistant response and tool results to messages
-            messages.append({"role": "assistant", "content": response.content})
+            # Plain dicts, so the SDK doesn't re-serialize the response models
+            # on every further iteration
+            messages.append({"role": "assistant", "content": [block.to_dict() for block in response.content]})
             messages.append({"role": "user", "content": tool_results})
 
         else:
@@ -515,29 +772,25 @@ async def chat(user_message: str, calendar_events: list = None) -> tuple[str, li
     logger.info("Parsing response for SAVE_FACT commands...")
     clean_response, facts = parse_save_facts(assistant_message)
 
+    auto_save = []
     needs_disambiguation = []
     if facts:
         logger.info(f"Processing {len(facts)} extracted facts...")
-        auto_save, needs_disambiguation = process_facts_for_saving(facts)
-
-        # Save facts that have a single match
-        for item in auto_save:
-            logger.debug(f"Auto-saving fact to contact {item['contact_id']}: {item['fact']}")
-            memory.update_contact_notes(item['contact_id'], item['fact'], append=True)
-            logger.info(f"Fact saved for {item['contact_name']}")
+        auto_save, needs_disambiguation = await asyncio.to_thread(process_facts_for_saving, facts)
 
         if needs_disambiguation:
             logger.info(f"{len(needs_disambiguation)} facts need disambiguation")
     else:
         logger.debug("No facts to save")
 
-    # Save conversation
+    # Save facts that have a single match together with the conversation,
+    # in one transaction - in the background, the reply doesn't wait for it
     logger.info("Saving conversation to memory...")
-    logger.debug(f"Saving user message: {user_message[:50]}...")
-    memory.add_conversation("user", user_message)
-    logger.debug(f"Saving assistant response: {clean_response[:50]}...")
-    memory.add_conversation("assistant", clean_response)
-    logger.info("Conversation saved successfully")
+    logger.debug("Saving user message: %s...", user_message[:50])
+    logger.debug("Saving assistant response: %s...", clean_response[:50])
+    task = asyncio.create_task(persist_turn(user_message, clean_response, auto_save))
+    pending_writes.add(task)
+    task.add_done_callback(pending_writes.discard)
 
     logger.info(f"chat() returning response ({len(clean_response)} characters)")
     return clean_response, needs_disambiguation
@@ -564,11 +817,19 @@ Max 1-2 Sätze, nur das Wichtigste."""
     logger.debug(f"Generated prompt ({len(prompt)} characters):")
     logger.debug(prompt)
 
+    # Same day and same prompt -> reuse the summary generated before
+    today = datetime.now(TIMEZONE).date().isoformat()
+    cache_key = hashlib.blake2b(f"{today}|{prompt}".encode(), digest_size=16).hexdigest()
+    cached = await asyncio.to_thread(memory.get_cached_summary, cache_key)
+    if cached:
+        logger.info("Returning cached daily summary")
+        return cached
+
     logger.info("Calling Anthropic API for daily summary...")
     logger.debug(f"Model: {LLM_MODEL}")
     logger.debug(f"Max tokens: 512")
 
-    response = client.messages.create(
+    response = await client.messages.create(
         model=LLM_MODEL,
         max_tokens=512,
         system="Du bist Luna, ein freundlicher persönlicher Assistent. Antworte auf Deutsch.",
@@ -578,6 +839,7 @@ Max 1-2 Sätze, nur das Wichtigste."""
     logger.info("API response received for daily summary")
 
     summary = response.content[0].text
+    await asyncio.to_thread(memory.save_cached_summary, cache_key, summary)
     logger.info(f"generate_daily_summary() returning ({len(summary)} characters)")
 
     return summary
@@ -1,5 +1,8 @@
 import sqlite3
 import json
+import logging
+import threading
+import time
 from datetime import datetime
 from luna.config import DB_PATH, get_logger
 
@@ -8,18 +11,75 @@ from luna.config import DB_PATH, get_logger
 # =============================================================================
 logger = get_logger("memory")
 logger.info("Memory module loading...")
-logger.debug(f"DB_PATH: {DB_PATH}")
+logger.debug("DB_PATH: %s", DB_PATH)
+
+# Stored in the database's user_version once init_db() has brought the
+# schema up to date - bump it whenever init_db() changes
+SCHEMA_VERSION = 1
+
+# Seconds the local contacts stay cached for building LLM context
+LOCAL_CONTACTS_CACHE_TTL = 300
+# (fetched_at, contacts, lowercased names joined into one "\x01"-separated
+#  string, start offset of each name in it plus the string's length)
+_local_contacts_cache: tuple[float, list[dict], str, list[int]] | None = None
+# {limit: recent conversation messages}, dropped whenever conversations are written
+_recent_conversations_cache: dict[int, list[dict]] = {}
+# Bumped on every conversation write, so a read that raced with a write
+# doesn't put its stale result into the cache
+_conversations_version = 0
+# One connection per thread, kept open for the life of the thread: the bot
+# calls into this module from asyncio.to_thread workers, and a sqlite3
+# connection must not be used from two threads
+_local = threading.local()
+
+
+def get_connection() -> sqlite3.Connection:
+    """Get this thread's database connection, opening it on first use."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        logger.debug("Connecting to database at %s in thread %s", DB_PATH, threading.get_ident())
+        # The connection lives as long as its thread, so its statement cache
+        # keeps every query of this module compiled after its first use
+        conn = sqlite3.connect(DB_PATH, cached_statements=256)
+        # Rows convert to dicts in C with dict(row) and can still be indexed
+        conn.row_factory = sqlite3.Row
+        # WAL (set persistently in init_db) only needs an fsync per checkpoint
+        # with synchronous=NORMAL; temp tables and sorts stay in memory, the
+        # page cache holds up to 64 MB, and reads go through a memory map
+        # instead of read() calls
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-65536")
+        conn.execute("PRAGMA mmap_size=268435456")
+        _local.conn = conn
+    elif conn.in_transaction:
+        # A previous call failed before committing - don't keep holding its lock
+        conn.rollback()
+    return conn
 
 
 def init_db():
     """Initialize the database with required tables."""
     logger.info("init_db() called")
-    logger.debug(f"Connecting to database at {DB_PATH}")
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     c = conn.cursor()
     logger.debug("Database connection established")
 
+    c.execute("PRAGMA user_version")
+    if c.fetchone()[0] >= SCHEMA_VERSION:
+        logger.info("Schema is at version %s - nothing to do", SCHEMA_VERSION)
+        return
+
+    # WAL is persistent in the database file, so every later connection
+    # commits by appending to the log instead of rewriting a rollback journal
+    c.execute("PRAGMA journal_mode=WAL")
+    logger.debug("Journal mode: %s", c.fetchone()[0])
+
+    # One transaction for the whole schema setup: sqlite3 doesn't open one for
+    # DDL by itself, so every CREATE would otherwise commit (and sync) alone
+    c.execute("BEGIN")
+
     # Facts table - stores information about contacts
     logger.info("Creating 'facts' table if not exists...")
     c.execute("""
@@ -34,6 +94,14 @@ def init_db():
     """)
     logger.debug("Facts table created/verified")
 
+    # Partial index: unreminded facts are found without scanning the ones
+    # already reminded, which is nearly all of them over time
+    c.execute("""
+        CREATE INDEX IF NOT EXISTS idx_facts_unreminded
+        ON facts(reminded) WHERE reminded = FALSE
+    """)
+    logger.debug("Facts index created/verified")
+
     # Conversation history for context
     logger.info("Creating 'conversations' table if not exists...")
     c.execute("""
@@ -77,326 +145,498 @@ def init_db():
     """)
     logger.debug("Reminders table created/verified")
 
+    # remind_at as unix epoch seconds, so pending reminders can be ordered
+    # and compared without parsing ISO strings
+    c.execute("PRAGMA table_info(reminders)")
+    if "remind_at_ts" not in {row[1] for row in c.fetchall()}:
+        logger.info("Adding 'remind_at_ts' column to reminders...")
+        c.execute("ALTER TABLE reminders ADD COLUMN remind_at_ts INTEGER")
+        c.execute("UPDATE reminders SET remind_at_ts = CAST(strftime('%s', remind_at) AS INTEGER)")
+    # Partial covering index: pending reminders are read in order straight
+    # from the index (id is the rowid), without touching the table or sorting.
+    # sent has to be an indexed column too, or SQLite won't treat it as covering
+    c.execute("DROP INDEX IF EXISTS idx_reminders_pending")
+    c.execute("""
+        CREATE INDEX IF NOT EXISTS idx_reminders_pending_covering
+        ON reminders(sent, remind_at_ts, message) WHERE sent = FALSE
+    """)
+    logger.debug("Reminders index created/verified")
+
+    # Sync state - stores Google sync tokens for incremental syncs
+    logger.info("Creating 'sync_state' table if not exists...")
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS sync_state (
+            key TEXT PRIMARY KEY,
+            value TEXT,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    logger.debug("Sync state table created/verified")
+
+    # Daily summaries, keyed by a hash of date and inputs, so a repeated
+    # summary for the same day and data doesn't call the LLM again
+    logger.info("Creating 'daily_summaries' table if not exists...")
+    c.execute("""
+        CREATE TABLE IF NOT EXISTS daily_summaries (
+            key TEXT PRIMARY KEY,
+            summary TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    logger.debug("Daily summaries table created/verified")
+
     # Create index for faster name lookups
     c.execute("CREATE INDEX IF NOT EXISTS idx_contacts_name ON contacts(name)")
-    c.execute("CREATE INDEX IF NOT EXISTS idx_contacts_google_id ON contacts(google_id)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_contacts_name_nocase ON contacts(name COLLATE NOCASE)")
+    # google_id is UNIQUE, which already gives it an index
+    c.execute("DROP INDEX IF EXISTS idx_contacts_google_id")
+    # Partial index for listing contacts with notes, ordered by name
+    c.execute("""
+        CREATE INDEX IF NOT EXISTS idx_contacts_has_notes ON contacts(name)
+        WHERE notes IS NOT NULL AND notes != ''
+    """)
     logger.debug("Contacts indexes created/verified")
 
-    conn.commit()
-    logger.debug("Schema changes committed")
+    # Full-text index over contacts, kept in sync by triggers
+    logger.info("Creating 'contacts_fts' table if not exists...")
+    c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'contacts_fts'")
+    fts_exists = c.fetchone() is not None
+    c.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5(
+            name, organization, notes,
+            content='contacts', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS contacts_fts_ai AFTER INSERT ON contacts BEGIN
+            INSERT INTO contacts_fts(rowid, name, organization, notes)
+            VALUES (new.id, new.name, new.organization, new.notes);
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS contacts_fts_ad AFTER DELETE ON contacts BEGIN
+            INSERT INTO contacts_fts(contacts_fts, rowid, name, organization, notes)
+            VALUES ('delete', old.id, old.name, old.organization, old.notes);
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS contacts_fts_au AFTER UPDATE ON contacts BEGIN
+            INSERT INTO contacts_fts(contacts_fts, rowid, name, organization, notes)
+            VALUES ('delete', old.id, old.name, old.organization, old.notes);
+            INSERT INTO contacts_fts(rowid, name, organization, notes)
+            VALUES (new.id, new.name, new.organization, new.notes);
+        END
+    """)
+    if not fts_exists:
+        logger.info("Populating 'contacts_fts' from existing contacts...")
+        c.execute("INSERT INTO contacts_fts(contacts_fts) VALUES ('rebuild')")
+    logger.debug("Contacts full-text index created/verified")
+
+    # Full-text index over facts, kept in sync the same way
+    logger.info("Creating 'facts_fts' table if not exists...")
+    c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'facts_fts'")
+    fts_exists = c.fetchone() is not None
+    c.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS facts_fts USING fts5(
+            contact_name, fact, context,
+            content='facts', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS facts_fts_ai AFTER INSERT ON facts BEGIN
+            INSERT INTO facts_fts(rowid, contact_name, fact, context)
+            VALUES (new.id, new.contact_name, new.fact, new.context);
+        END
+    """)
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS facts_fts_ad AFTER DELETE ON facts BEGIN
+            INSERT INTO facts_fts(facts_fts, rowid, contact_name, fact, context)
+            VALUES ('delete', old.id, old.contact_name, old.fact, old.context);
+        END
+    """)
+    # Only the indexed columns - marking a fact as reminded leaves the index alone
+    c.execute("""
+        CREATE TRIGGER IF NOT EXISTS facts_fts_au AFTER UPDATE OF contact_name, fact, context ON facts BEGIN
+            INSERT INTO facts_fts(facts_fts, rowid, contact_name, fact, context)
+            VALUES ('delete', old.id, old.contact_name, old.fact, old.context);
+            INSERT INTO facts_fts(rowid, contact_name, fact, context)
+            VALUES (new.id, new.contact_name, new.fact, new.context);
+        END
+    """)
+    if not fts_exists:
+        logger.info("Populating 'facts_fts' from existing facts...")
+        c.execute("INSERT INTO facts_fts(facts_fts) VALUES ('rebuild')")
+    logger.debug("Facts full-text index created/verified")
 
-    conn.close()
-    logger.debug("Database connection closed")
+    # PRAGMA doesn't take parameters
+    c.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.commit()
+    logger.debug("Schema changes committed (version %s)", SCHEMA_VERSION)
 
     logger.info("init_db() completed successfully")
 
 
+def build_fts_query(query: str, column: str | None = None) -> str:
+    """Turn free text into an FTS5 prefix query, e.g. 'ann hu' -> '"ann"* "hu"*'.
+
+    With a column, only that column is matched: 'name : ("ann"* "hu"*)'.
+    """
+    terms = [term.replace('"', '""') for term in query.split()]
+    fts_query = " ".join(f'"{term}"*' for term in terms)
+    if column and fts_query:
+        return f"{column} : ({fts_query})"
+    return fts_query
+
+
 def add_fact(contact_name: str, fact: str, context: str = None):
     """Store a fact about a contact."""
     logger.info("add_fact() called")
-    logger.debug(f"Contact name: {contact_name}")
-    logger.debug(f"Fact: {fact}")
-    logger.debug(f"Context: {context}")
+    logger.debug("Contact name: %s", contact_name)
+    logger.debug("Fact: %s", fact)
+    logger.debug("Context: %s", context)
 
-    logger.debug(f"Connecting to database at {DB_PATH}")
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-
-    contact_lower = contact_name.lower()
-    logger.debug(f"Normalized contact name: {contact_lower}")
-
-    logger.info(f"Inserting fact for contact '{contact_lower}'...")
-    c.execute(
-        "INSERT INTO facts (contact_name, fact, context) VALUES (?, ?, ?)",
-        (contact_lower, fact, context)
-    )
+    add_facts_many([(contact_name, fact, context)])
 
-    last_id = c.lastrowid
-    logger.debug(f"Inserted row ID: {last_id}")
 
-    conn.commit()
-    logger.debug("Transaction committed")
+def add_facts_many(facts: list[tuple[str, str, str | None]]):
+    """Store several (contact_name, fact, context) facts in a single transaction."""
+    logger.info("add_facts_many() called with %s facts", len(facts))
 
-    conn.close()
-    logger.debug("Database connection closed")
+    conn = get_connection()
+    with conn:
+        conn.executemany(
+            "INSERT INTO facts (contact_name, fact, context) VALUES (?, ?, ?)",
+            [(contact_name.lower(), fact, context) for contact_name, fact, context in facts]
+        )
 
-    logger.info(f"add_fact() completed - fact ID: {last_id}")
+    logger.info("add_facts_many() completed - %s facts stored", len(facts))
 
 
 def get_facts_for_contact(contact_name: str) -> list[dict]:
     """Retrieve all facts about a contact."""
-    logger.info(f"get_facts_for_contact() called for '{contact_name}'")
+    logger.info("get_facts_for_contact() called for '%s'", contact_name)
 
-    logger.debug(f"Connecting to database at {DB_PATH}")
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    conn = get_connection()
 
-    search_pattern = f"%{contact_name.lower()}%"
-    logger.debug(f"Search pattern: {search_pattern}")
+    fts_query = build_fts_query(contact_name, "contact_name")
+    logger.debug("FTS query: %s", fts_query)
 
-    logger.info(f"Querying facts for contact like '{search_pattern}'...")
-    c.execute(
-        "SELECT fact, context, created_at, reminded FROM facts WHERE contact_name LIKE ?",
-        (search_pattern,)
-    )
-
-    rows = c.fetchall()
-    logger.debug(f"Query returned {len(rows)} rows")
-
-    conn.close()
-    logger.debug("Database connection closed")
+    logger.info("Querying facts for contact matching '%s'...", fts_query)
+    if fts_query:
+        rows = conn.execute("""
+            SELECT f.fact, f.context, f.created_at, f.reminded
+            FROM facts_fts JOIN facts f ON f.id = facts_fts.rowid
+            WHERE facts_fts MATCH ?
+            ORDER BY f.id
+        """, (fts_query,)).fetchall()
+    else:
+        rows = conn.execute("SELECT fact, context, created_at, reminded FROM facts ORDER BY id").fetchall()
+    logger.debug("Query returned %s rows", len(rows))
 
-    result = [{"fact": r[0], "context": r[1], "created_at": r[2], "reminded": r[3]} for r in rows]
+    result = [dict(r) for r in rows]
 
-    logger.info(f"get_facts_for_contact() returning {len(result)} facts")
-    for i, r in enumerate(result):
-        logger.debug(f"Fact {i+1}: {r['fact'][:50]}..." if len(r['fact']) > 50 else f"Fact {i+1}: {r['fact']}")
+    logger.info("get_facts_for_contact() returning %s facts", len(result))
+    if logger.isEnabledFor(logging.DEBUG):
+        for i, r in enumerate(result):
+            logger.debug("Fact %s: %s%s", i + 1, r['fact'][:50], "..." if len(r['fact']) > 50 else "")
 
     return result
 
 
-def get_unreminded_facts() -> list[dict]:
-    """Get facts that haven't been reminded yet."""
-    logger.info("get_unreminded_facts() called")
+def get_unreminded_facts(limit: int | None = None) -> list[dict]:
+    """Get facts that haven't been reminded yet, optionally only the first `limit`."""
+    logger.info("get_unreminded_facts() called with limit=%s", limit)
 
-    logger.debug(f"Connecting to database at {DB_PATH}")
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    conn = get_connection()
 
     logger.info("Querying unreminded facts...")
-    c.execute(
-        "SELECT id, contact_name, fact, context FROM facts WHERE reminded = FALSE"
-    )
+    # LIMIT -1 means no limit in SQLite
+    rows = conn.execute(
+        "SELECT id, contact_name, fact, context FROM facts WHERE reminded = FALSE LIMIT ?",
+        (limit if limit is not None else -1,)
+    ).fetchall()
+    logger.debug("Query returned %s rows", len(rows))
 
-    rows = c.fetchall()
-    logger.debug(f"Query returned {len(rows)} rows")
+    result = [{**r, "display": r["contact_name"].title()} for r in map(dict, rows)]
 
-    conn.close()
-    logger.debug("Database connection closed")
-
-    result = [{"id": r[0], "contact_name": r[1], "fact": r[2], "context": r[3]} for r in rows]
-
-    logger.info(f"get_unreminded_facts() returning {len(result)} facts")
-    for r in result:
-        logger.debug(f"Unreminded fact ID {r['id']}: {r['contact_name']} - {r['fact'][:30]}...")
+    logger.info("get_unreminded_facts() returning %s facts", len(result))
+    if logger.isEnabledFor(logging.DEBUG):
+        for r in result:
+            logger.debug("Unreminded fact ID %s: %s - %s...", r['id'], r['contact_name'], r['fact'][:30])
 
     return result
 
 
 def mark_fact_reminded(fact_id: int):
     """Mark a fact as reminded."""
-    logger.info(f"mark_fact_reminded() called for fact ID {fact_id}")
-
-    logger.debug(f"Connecting to database at {DB_PATH}")
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-
-    logger.info(f"Updating fact {fact_id} to reminded=TRUE...")
-    c.execute("UPDATE facts SET reminded = TRUE WHERE id = ?", (fact_id,))
+    logger.info("mark_fact_reminded() called for fact ID %s", fact_id)
 
-    rows_affected = c.rowcount
-    logger.debug(f"Rows affected: {rows_affected}")
-
-    conn.commit()
-    logger.debug("Transaction committed")
+    conn = get_connection()
 
-    conn.close()
-    logger.debug("Database connection closed")
+    logger.info("Updating fact %s to reminded=TRUE...", fact_id)
+    with conn:
+        rows_affected = conn.execute("UPDATE facts SET reminded = TRUE WHERE id = ?", (fact_id,)).rowcount
+    logger.debug("Rows affected: %s", rows_affected)
 
-    logger.info(f"mark_fact_reminded() completed - {rows_affected} rows updated")
+    logger.info("mark_fact_reminded() completed - %s rows updated", rows_affected)
 
 
 def search_facts(query: str) -> list[dict]:
     """Search facts by keyword."""
-    logger.info(f"search_facts() called with query='{query}'")
+    logger.info("search_facts() called with query='%s'", query)
 
-    logger.debug(f"Connecting to database at {DB_PATH}")
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    conn = get_connection()
 
-    search_pattern = f"%{query}%"
-    logger.debug(f"Search pattern: {search_pattern}")
+    fts_query = build_fts_query(query, "{contact_name fact}")
+    logger.debug("FTS query: %s", fts_query)
 
-    logger.info(f"Searching facts matching '{search_pattern}'...")
-    c.execute(
-        "SELECT contact_name, fact, context, created_at FROM facts WHERE fact LIKE ? OR contact_name LIKE ?",
-        (search_pattern, search_pattern)
-    )
-
-    rows = c.fetchall()
-    logger.debug(f"Query returned {len(rows)} rows")
-
-    conn.close()
-    logger.debug("Database connection closed")
+    logger.info("Searching facts matching '%s'...", fts_query)
+    if fts_query:
+        rows = conn.execute("""
+            SELECT f.contact_name, f.fact, f.context, f.created_at
+            FROM facts_fts JOIN facts f ON f.id = facts_fts.rowid
+            WHERE facts_fts MATCH ?
+            ORDER BY rank
+        """, (fts_query,)).fetchall()
+    else:
+        rows = conn.execute("SELECT contact_name, fact, context, created_at FROM facts ORDER BY id").fetchall()
+    logger.debug("Query returned %s rows", len(rows))
 
-    result = [{"contact_name": r[0], "fact": r[1], "context": r[2], "created_at": r[3]} for r in rows]
+    result = [dict(r) for r in rows]
 
-    logger.info(f"search_facts() returning {len(result)} facts")
-    for r in result:
-        logger.debug(f"Found: {r['contact_name']} - {r['fact'][:30]}...")
+    logger.info("search_facts() returning %s facts", len(result))
+    if logger.isEnabledFor(logging.DEBUG):
+        for r in result:
+            logger.debug("Found: %s - %s...", r['contact_name'], r['fact'][:30])
 
     return result
 
 
 def add_conversation(role: str, content: str):
     """Store a conversation message."""
-    logger.info(f"add_conversation() called")
-    logger.debug(f"Role: {role}")
-    logger.debug(f"Content length: {len(content)} characters")
-    logger.debug(f"Content preview: {content[:100]}..." if len(content) > 100 else f"Content: {content}")
+    logger.info("add_conversation() called")
+    logger.debug("Role: %s", role)
+    logger.debug("Content length: %s characters", len(content))
+    logger.debug("Content preview: %s%s", content[:100], "..." if len(content) > 100 else "")
 
-    logger.debug(f"Connecting to database at {DB_PATH}")
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    add_conversations_many([(role, content)])
 
-    logger.info(f"Inserting conversation message with role='{role}'...")
-    c.execute(
-        "INSERT INTO conversations (role, content) VALUES (?, ?)",
-        (role, content)
-    )
 
-    last_id = c.lastrowid
-    logger.debug(f"Inserted row ID: {last_id}")
+def add_conversations_many(messages: list[tuple[str, str]]):
+    """Store several (role, content) conversation messages in a single transaction."""
+    logger.info("add_conversations_many() called with %s messages", len(messages))
+
+    conn = get_connection()
+    with conn:
+        conn.executemany("INSERT INTO conversations (role, content) VALUES (?, ?)", messages)
+
+    invalidate_recent_conversations_cache()
+
+    logger.info("add_conversations_many() completed - %s messages stored", len(messages))
 
-    conn.commit()
-    logger.debug("Transaction committed")
 
-    conn.close()
-    logger.debug("Database connection closed")
+# Appends a dated entry (?1) to a contact's notes inside SQLite, without
+# reading the existing notes first
+APPEND_NOTE_SQL = """
+    UPDATE contacts
+    SET notes = CASE WHEN notes IS NULL OR notes = '' THEN ?1 ELSE notes || char(10) || ?1 END,
+        updated_at = ?2
+    WHERE id = ?3
+"""
 
-    logger.info(f"add_conversation() completed - message ID: {last_id}")
+
+def write_turn(user_message: str, assistant_message: str, notes: list[tuple[int, str]] = ()):
+    """Store one chat turn and the notes it produced in a single transaction.
+
+    `notes` are (contact_id, note) pairs appended like update_contact_notes(append=True).
+    """
+    logger.info("write_turn() called with %s notes", len(notes))
+
+    conn = get_connection()
+
+    now = datetime.now()
+    timestamp = now.strftime("%Y-%m-%d")
+    with conn:
+        conn.executemany(
+            APPEND_NOTE_SQL,
+            [(f"{timestamp}: {note}", now.isoformat(), contact_id) for contact_id, note in notes]
+        )
+        conn.executemany(
+            "INSERT INTO conversations (role, content) VALUES (?, ?)",
+            [("user", user_message), ("assistant", assistant_message)]
+        )
+
+    invalidate_recent_conversations_cache()
+    if notes:
+        invalidate_local_contacts_cache()
+    logger.info("write_turn() completed")
 
 
 def get_recent_conversations(limit: int = 20) -> list[dict]:
     """Get recent conversation history."""
-    logger.info(f"get_recent_conversations() called with limit={limit}")
+    logger.info("get_recent_conversations() called with limit=%s", limit)
 
-    logger.debug(f"Connecting to database at {DB_PATH}")
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    if limit in _recent_conversations_cache:
+        logger.debug("Returning cached conversations")
+        return _recent_conversations_cache[limit]
 
-    logger.info(f"Querying {limit} most recent conversations...")
-    c.execute(
-        "SELECT role, content FROM conversations ORDER BY created_at DESC LIMIT ?",
-        (limit,)
-    )
+    version = _conversations_version
+    conn = get_connection()
 
-    rows = c.fetchall()
-    logger.debug(f"Query returned {len(rows)} rows")
-
-    conn.close()
-    logger.debug("Database connection closed")
+    logger.info("Querying %s most recent conversations...", limit)
+    rows = conn.execute(
+        "SELECT role, content FROM conversations ORDER BY created_at DESC, id DESC LIMIT ?",
+        (limit,)
+    ).fetchall()
+    logger.debug("Query returned %s rows", len(rows))
 
     # Reverse to get chronological order
-    result = [{"role": r[0], "content": r[1]} for r in reversed(rows)]
+    result = [dict(r) for r in reversed(rows)]
 
-    logger.info(f"get_recent_conversations() returning {len(result)} messages (chronological order)")
-    for i, r in enumerate(result):
-        logger.debug(f"Conversation {i+1}: [{r['role']}] {r['content'][:50]}...")
+    logger.info("get_recent_conversations() returning %s messages (chronological order)", len(result))
+    if logger.isEnabledFor(logging.DEBUG):
+        for i, r in enumerate(result):
+            logger.debug("Conversation %s: [%s] %s...", i + 1, r['role'], r['content'][:50])
 
+    if version == _conversations_version:
+        _recent_conversations_cache[limit] = result
     return result
 
 
+def invalidate_recent_conversations_cache():
+    """Drop the cached recent conversations after they changed."""
+    global _conversations_version
+    _conversations_version += 1
+    _recent_conversations_cache.clear()
+
+
+def clear_conversations() -> int:
+    """Delete the whole conversation history. Returns number of deleted messages."""
+    logger.info("clear_conversations() called")
+
+    conn = get_connection()
+    c = conn.cursor()
+
+    c.execute("DELETE FROM conversations")
+    deleted_count = c.rowcount
+
+    conn.commit()
+    invalidate_recent_conversations_cache()
+
+    logger.info("Deleted %s conversation records", deleted_count)
+    return deleted_count
+
+
 # =============================================================================
 # CONTACTS FUNCTIONS
 # =============================================================================
 
+# Let SQLite decide insert vs. update; notes are never touched
+UPSERT_CONTACT_SQL = """
+    INSERT INTO contacts (google_id, name, emails, phones, organization, synced_at, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(google_id) DO UPDATE SET
+        name = excluded.name,
+        emails = excluded.emails,
+        phones = excluded.phones,
+        organization = excluded.organization,
+        synced_at = excluded.synced_at,
+        updated_at = excluded.updated_at
+"""
+
+
+def contact_row(google_id: str, name: str, emails: list, phones: list, organization: str, now: str) -> tuple:
+    """Build the UPSERT_CONTACT_SQL parameters for one contact."""
+    emails_json = json.dumps(emails) if emails else None
+    phones_json = json.dumps(phones) if phones else None
+    return (google_id, name, emails_json, phones_json, organization, now, now, now)
+
+
 def upsert_contact(google_id: str, name: str, emails: list, phones: list, organization: str = None) -> int:
     """Insert or update a contact from Google. Returns contact ID."""
-    logger.info(f"upsert_contact() called for '{name}'")
-    logger.debug(f"google_id: {google_id}")
+    logger.info("upsert_contact() called for '%s'", name)
+    logger.debug("google_id: %s", google_id)
 
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    conn = get_connection()
+    now = datetime.now().isoformat()
+    with conn:
+        contact_id = conn.execute(
+            UPSERT_CONTACT_SQL + "RETURNING id",
+            contact_row(google_id, name, emails, phones, organization, now)
+        ).fetchone()[0]
+    logger.debug("Upserted contact ID %s", contact_id)
 
-    emails_json = json.dumps(emails) if emails else None
-    phones_json = json.dumps(phones) if phones else None
+    invalidate_local_contacts_cache()
+
+    return contact_id
+
+
+def upsert_contacts_many(contacts: list[dict]):
+    """Insert or update several contacts from Google in a single transaction.
+
+    Each contact is a dict with google_id, name, emails, phones and
+    optionally organization.
+    """
+    logger.info("upsert_contacts_many() called with %s contacts", len(contacts))
+
+    conn = get_connection()
     now = datetime.now().isoformat()
+    with conn:
+        conn.executemany(UPSERT_CONTACT_SQL, [
+            contact_row(c["google_id"], c["name"], c["emails"], c["phones"], c.get("organization"), now)
+            for c in contacts
+        ])
 
-    # Check if contact exists
-    c.execute("SELECT id, notes FROM contacts WHERE google_id = ?", (google_id,))
-    existing = c.fetchone()
-
-    if existing:
-        contact_id = existing[0]
-        # Update but preserve notes
-        c.execute("""
-            UPDATE contacts
-            SET name = ?, emails = ?, phones = ?, organization = ?, synced_at = ?, updated_at = ?
-            WHERE google_id = ?
-        """, (name, emails_json, phones_json, organization, now, now, google_id))
-        logger.debug(f"Updated existing contact ID {contact_id}")
-    else:
-        c.execute("""
-            INSERT INTO contacts (google_id, name, emails, phones, organization, synced_at, created_at, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, (google_id, name, emails_json, phones_json, organization, now, now, now))
-        contact_id = c.lastrowid
-        logger.debug(f"Inserted new contact ID {contact_id}")
+    invalidate_local_contacts_cache()
+    logger.info("upsert_contacts_many() completed - %s contacts", len(contacts))
 
-    conn.commit()
-    conn.close()
 
-    return contact_id
+def contact_from_row(row: sqlite3.Row) -> dict:
+    """Turn a contacts row into a dict, decoding the JSON emails and phones."""
+    contact = dict(row)
+    contact["emails"] = json.loads(contact["emails"]) if contact["emails"] else []
+    contact["phones"] = json.loads(contact["phones"]) if contact["phones"] else []
+    return contact
 
 
 def get_contact_by_id(contact_id: int) -> dict | None:
     """Get a contact by ID."""
-    logger.debug(f"get_contact_by_id() called for ID {contact_id}")
+    logger.debug("get_contact_by_id() called for ID %s", contact_id)
 
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-
-    c.execute("""
+    conn = get_connection()
+    row = conn.execute("""
         SELECT id, google_id, name, emails, phones, organization, notes, synced_at, created_at, updated_at
         FROM contacts WHERE id = ?
-    """, (contact_id,))
-    row = c.fetchone()
-    conn.close()
-
-    if row:
-        return {
-            "id": row[0],
-            "google_id": row[1],
-            "name": row[2],
-            "emails": json.loads(row[3]) if row[3] else [],
-            "phones": json.loads(row[4]) if row[4] else [],
-            "organization": row[5],
-            "notes": row[6],
-            "synced_at": row[7],
-            "created_at": row[8],
-            "updated_at": row[9]
-        }
-    return None
+    """, (contact_id,)).fetchone()
+
+    return contact_from_row(row) if row else None
 
 
 def search_contacts_by_name(query: str) -> list[dict]:
-    """Search contacts by name (case-insensitive, partial match)."""
-    logger.info(f"search_contacts_by_name() called with query='{query}'")
+    """Search contacts by name (case-insensitive, every word a prefix of a name word)."""
+    logger.info("search_contacts_by_name() called with query='%s'", query)
+
+    conn = get_connection()
+
+    fts_query = build_fts_query(query, "name")
+    if fts_query:
+        rows = conn.execute("""
+            SELECT c.id, c.google_id, c.name, c.emails, c.phones, c.organization, c.notes
+            FROM contacts_fts JOIN contacts c ON c.id = contacts_fts.rowid
+            WHERE contacts_fts MATCH ?
+            ORDER BY c.name
+        """, (fts_query,)).fetchall()
+    else:
+        rows = conn.execute("""
+            SELECT id, google_id, name, emails, phones, organization, notes
+            FROM contacts ORDER BY name
+        """).fetchall()
 
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    result = [contact_from_row(r) for r in rows]
 
-    search_pattern = f"%{query}%"
-    c.execute("""
-        SELECT id, google_id, name, emails, phones, organization, notes
-        FROM contacts WHERE name LIKE ? COLLATE NOCASE
-        ORDER BY name
-    """, (search_pattern,))
-    rows = c.fetchall()
-    conn.close()
-
-    result = [{
-        "id": r[0],
-        "google_id": r[1],
-        "name": r[2],
-        "emails": json.loads(r[3]) if r[3] else [],
-        "phones": json.loads(r[4]) if r[4] else [],
-        "organization": r[5],
-        "notes": r[6]
-    } for r in rows]
-
-    logger.debug(f"Found {len(result)} contacts matching '{query}'")
+    logger.debug("Found %s contacts matching '%s'", len(result), query)
     return result
 
 
@@ -404,135 +644,138 @@ def get_all_local_contacts() -> list[dict]:
     """Get all locally cached contacts."""
     logger.info("get_all_local_contacts() called")
 
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-
-    c.execute("""
+    conn = get_connection()
+    rows = conn.execute("""
         SELECT id, google_id, name, emails, phones, organization, notes
         FROM contacts ORDER BY name
-    """)
-    rows = c.fetchall()
-    conn.close()
-
-    result = [{
-        "id": r[0],
-        "google_id": r[1],
-        "name": r[2],
-        "emails": json.loads(r[3]) if r[3] else [],
-        "phones": json.loads(r[4]) if r[4] else [],
-        "organization": r[5],
-        "notes": r[6]
-    } for r in rows]
-
-    logger.debug(f"Returning {len(result)} total contacts")
+    """).fetchall()
+
+    result = [contact_from_row(r) for r in rows]
+
+    logger.debug("Returning %s total contacts", len(result))
     return result
 
 
-def get_contacts_with_notes() -> list[dict]:
-    """Get all contacts that have notes."""
-    logger.info("get_contacts_with_notes() called")
+def get_cached_local_contacts() -> tuple[list[dict], str, list[int]]:
+    """Get all local contacts and a searchable string of their names.
 
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    The contacts only have id, google_id, name, organization and notes.
 
-    c.execute("""
+    The lowercased names are joined into one string, so a substring search
+    over all names is a single str.find(); the offsets map a match position
+    back to its contact (see llm.build_context).
+
+    Reread after LOCAL_CONTACTS_CACHE_TTL or once a contact has been written.
+    """
+    global _local_contacts_cache
+
+    if _local_contacts_cache and time.monotonic() - _local_contacts_cache[0] < LOCAL_CONTACTS_CACHE_TTL:
+        logger.debug("Returning cached local contacts")
+        return _local_contacts_cache[1:]
+
+    # Building context never needs emails or phones - leaving them out
+    # saves decoding their JSON for every contact on each reload
+    rows = get_connection().execute("""
+        SELECT id, google_id, name, organization, notes
+        FROM contacts ORDER BY name
+    """).fetchall()
+    contacts = [dict(r) for r in rows]
+    names_lower = [c["name"].lower() for c in contacts]
+    name_corpus = "\x01" + "\x01".join(names_lower) + "\x01"
+    name_offsets = []
+    offset = 1
+    for name in names_lower:
+        name_offsets.append(offset)
+        offset += len(name) + 1
+    name_offsets.append(len(name_corpus))
+    _local_contacts_cache = (time.monotonic(), contacts, name_corpus, name_offsets)
+    return _local_contacts_cache[1:]
+
+
+def invalidate_local_contacts_cache():
+    """Drop the cached local contacts, e.g. after another process synced them."""
+    global _local_contacts_cache
+    _local_contacts_cache = None
+
+
+def get_contacts_with_notes(limit: int | None = None) -> list[dict]:
+    """Get all contacts that have notes, optionally only the first `limit` by name."""
+    logger.info("get_contacts_with_notes() called with limit=%s", limit)
+
+    conn = get_connection()
+
+    # LIMIT -1 means no limit in SQLite
+    rows = conn.execute("""
         SELECT id, google_id, name, emails, phones, organization, notes
         FROM contacts
         WHERE notes IS NOT NULL AND notes != ''
         ORDER BY name
-    """)
-    rows = c.fetchall()
-    conn.close()
-
-    result = [{
-        "id": r[0],
-        "google_id": r[1],
-        "name": r[2],
-        "emails": json.loads(r[3]) if r[3] else [],
-        "phones": json.loads(r[4]) if r[4] else [],
-        "organization": r[5],
-        "notes": r[6]
-    } for r in rows]
-
-    logger.info(f"Found {len(result)} contacts with notes")
+        LIMIT ?
+    """, (limit if limit is not None else -1,)).fetchall()
+
+    result = [contact_from_row(r) for r in rows]
+
+    logger.info("Found %s contacts with notes", len(result))
     return result
 
 
 def update_contact_notes(contact_id: int, notes: str, append: bool = True) -> bool:
     """Update or append to a contact's notes. Returns success status."""
-    logger.info(f"update_contact_notes() called for contact ID {contact_id}")
-    logger.debug(f"append={append}, notes length={len(notes)}")
+    logger.info("update_contact_notes() called for contact ID %s", contact_id)
+    logger.debug("append=%s, notes length=%s", append, len(notes))
 
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    conn = get_connection()
 
-    if append:
-        # Get existing notes
-        c.execute("SELECT notes FROM contacts WHERE id = ?", (contact_id,))
-        row = c.fetchone()
-        if not row:
-            conn.close()
-            logger.warning(f"Contact ID {contact_id} not found")
-            return False
-
-        existing_notes = row[0] or ""
-        timestamp = datetime.now().strftime("%Y-%m-%d")
-        new_entry = f"{timestamp}: {notes}"
-
-        if existing_notes:
-            updated_notes = f"{existing_notes}\n{new_entry}"
+    now = datetime.now()
+    with conn:
+        if append:
+            entry = f"{now.strftime('%Y-%m-%d')}: {notes}"
+            cursor = conn.execute(APPEND_NOTE_SQL, (entry, now.isoformat(), contact_id))
         else:
-            updated_notes = new_entry
+            cursor = conn.execute(
+                "UPDATE contacts SET notes = ?, updated_at = ? WHERE id = ?",
+                (notes, now.isoformat(), contact_id)
+            )
+
+    success = cursor.rowcount > 0
+    if success:
+        invalidate_local_contacts_cache()
     else:
-        updated_notes = notes
-
-    now = datetime.now().isoformat()
-    c.execute("UPDATE contacts SET notes = ?, updated_at = ? WHERE id = ?", (updated_notes, now, contact_id))
+        logger.warning("Contact ID %s not found", contact_id)
 
-    success = c.rowcount > 0
-    conn.commit()
-    conn.close()
-
-    logger.info(f"Notes updated: {success}")
+    logger.info("Notes updated: %s", success)
     return success
 
 
 def delete_contacts_not_in_google_without_notes(google_ids: set) -> int:
     """Delete contacts that are no longer in Google AND have no notes. Returns count deleted."""
-    logger.info(f"delete_contacts_not_in_google_without_notes() called with {len(google_ids)} Google IDs")
+    logger.info("delete_contacts_not_in_google_without_notes() called with %s Google IDs", len(google_ids))
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     c = conn.cursor()
 
-    # Find contacts not in Google IDs list and without notes
-    placeholders = ",".join("?" * len(google_ids)) if google_ids else "''"
-    query = f"""
+    # Find contacts not in Google IDs list and without notes. The IDs go in
+    # as one JSON array, so any number of them binds to a single parameter;
+    # an empty array keeps no contact, as before
+    c.execute("""
         DELETE FROM contacts
-        WHERE google_id NOT IN ({placeholders})
+        WHERE google_id NOT IN (SELECT value FROM json_each(?))
         AND (notes IS NULL OR notes = '')
-    """
-
-    if google_ids:
-        c.execute(query, tuple(google_ids))
-    else:
-        c.execute("DELETE FROM contacts WHERE notes IS NULL OR notes = ''")
+    """, (json.dumps(list(google_ids)),))
 
     deleted_count = c.rowcount
     conn.commit()
-    conn.close()
+    invalidate_local_contacts_cache()
 
-    logger.info(f"Deleted {deleted_count} contacts no longer in Google (without notes)")
+    logger.info("Deleted %s contacts no longer in Google (without notes)", deleted_count)
     return deleted_count
 
 
 def get_local_google_ids() -> set:
     """Get all Google IDs currently in local database."""
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute("SELECT google_id FROM contacts WHERE google_id IS NOT NULL")
-    ids = {row[0] for row in c.fetchall()}
-    conn.close()
-    return ids
+    conn = get_connection()
+    rows = conn.execute("SELECT google_id FROM contacts WHERE google_id IS NOT NULL").fetchall()
+    return {row[0] for row in rows}
 
 
 # =============================================================================
@@ -541,94 +784,173 @@ def get_local_google_ids() -> set:
 
 def add_reminder(message: str, remind_at: datetime) -> int:
     """Create a new reminder. Returns reminder ID."""
-    logger.info(f"add_reminder() called: '{message}' at {remind_at}")
+    logger.info("add_reminder() called: '%s' at %s", message, remind_at)
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_connection()
     c = conn.cursor()
 
     c.execute(
-        "INSERT INTO reminders (message, remind_at) VALUES (?, ?)",
-        (message, remind_at.isoformat())
+        "INSERT INTO reminders (message, remind_at, remind_at_ts) VALUES (?, ?, ?)",
+        (message, remind_at.isoformat(), int(remind_at.timestamp()))
     )
 
     reminder_id = c.lastrowid
     conn.commit()
-    conn.close()
 
-    logger.info(f"Reminder created with ID {reminder_id}")
+    logger.info("Reminder created with ID %s", reminder_id)
     return reminder_id
 
 
+def claim_due_reminders() -> list[dict]:
+    """Mark all due, unsent reminders as sent and return them, in one statement.
+
+    A reminder claimed here (or by claim_reminder) is never returned again,
+    so two senders can't deliver it twice; hand the ones that failed to send
+    back with release_reminders().
+    """
+    logger.debug("claim_due_reminders() called")
+
+    conn = get_connection()
+    now = int(time.time())
+    with conn:
+        rows = conn.execute("""
+            UPDATE reminders SET sent = TRUE
+            WHERE remind_at_ts <= ? AND sent = FALSE
+            RETURNING id, message, remind_at
+        """, (now,)).fetchall()
+
+    result = [dict(r) for r in rows]
+    logger.debug("Claimed %s due reminders", len(result))
+    return result
+
+
+def claim_reminder(reminder_id: int) -> dict | None:
+    """Mark a single reminder as sent and return it, unless it was deleted or already sent."""
+    logger.debug("claim_reminder() called for ID %s", reminder_id)
+
+    conn = get_connection()
+    with conn:
+        row = conn.execute("""
+            UPDATE reminders SET sent = TRUE
+            WHERE id = ? AND sent = FALSE
+            RETURNING id, message, remind_at
+        """, (reminder_id,)).fetchone()
+
+    return dict(row) if row else None
+
+
+def release_reminders(reminder_ids: list[int]):
+    """Mark claimed reminders as unsent again, so the next sweep retries them."""
+    logger.info("release_reminders() called for %s IDs", len(reminder_ids))
+
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "UPDATE reminders SET sent = FALSE WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(reminder_ids),)
+        )
+
+
 def get_due_reminders() -> list[dict]:
     """Get all reminders that are due and not yet sent."""
     logger.debug("get_due_reminders() called")
 
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    conn = get_connection()
 
-    now = datetime.now().isoformat()
-    c.execute(
-        "SELECT id, message, remind_at FROM reminders WHERE remind_at <= ? AND sent = FALSE",
+    now = int(time.time())
+    rows = conn.execute(
+        "SELECT id, message, remind_at FROM reminders WHERE remind_at_ts <= ? AND sent = FALSE",
         (now,)
-    )
-
-    rows = c.fetchall()
-    conn.close()
+    ).fetchall()
 
-    result = [{"id": r[0], "message": r[1], "remind_at": r[2]} for r in rows]
-    logger.debug(f"Found {len(result)} due reminders")
+    result = [dict(r) for r in rows]
+    logger.debug("Found %s due reminders", len(result))
     return result
 
 
 def mark_reminder_sent(reminder_id: int):
     """Mark a reminder as sent."""
-    logger.info(f"mark_reminder_sent() called for ID {reminder_id}")
+    logger.info("mark_reminder_sent() called for ID %s", reminder_id)
 
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    # Same statement as the batch version, so both share one cached statement
+    mark_reminders_sent([reminder_id])
 
-    c.execute("UPDATE reminders SET sent = TRUE WHERE id = ?", (reminder_id,))
 
-    conn.commit()
-    conn.close()
+def mark_reminders_sent(reminder_ids: list[int]):
+    """Mark several reminders as sent in a single transaction."""
+    logger.info("mark_reminders_sent() called for %s IDs", len(reminder_ids))
+
+    conn = get_connection()
+    with conn:
+        conn.executemany("UPDATE reminders SET sent = TRUE WHERE id = ?", [(i,) for i in reminder_ids])
 
-    logger.debug(f"Reminder {reminder_id} marked as sent")
+    logger.debug("Reminders %s marked as sent", reminder_ids)
 
 
 def get_pending_reminders() -> list[dict]:
     """Get all pending (unsent) reminders."""
     logger.debug("get_pending_reminders() called")
 
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    conn = get_connection()
 
-    c.execute(
-        "SELECT id, message, remind_at FROM reminders WHERE sent = FALSE ORDER BY remind_at"
-    )
-
-    rows = c.fetchall()
-    conn.close()
+    rows = conn.execute(
+        "SELECT id, message, remind_at FROM reminders WHERE sent = FALSE ORDER BY remind_at_ts"
+    ).fetchall()
 
-    result = [{"id": r[0], "message": r[1], "remind_at": r[2]} for r in rows]
-    logger.debug(f"Found {len(result)} pending reminders")
+    result = [dict(r) for r in rows]
+    logger.debug("Found %s pending reminders", len(result))
     return result
 
 
+def get_pending_reminder(reminder_id: int) -> dict | None:
+    """Get a single reminder if it exists and has not been sent yet."""
+    logger.debug("get_pending_reminder() called for ID %s", reminder_id)
+
+    conn = get_connection()
+
+    row = conn.execute(
+        "SELECT id, message, remind_at FROM reminders WHERE id = ? AND sent = FALSE",
+        (reminder_id,)
+    ).fetchone()
+
+    return dict(row) if row else None
+
+
 def delete_reminder(reminder_id: int) -> bool:
     """Delete a reminder. Returns True if deleted."""
-    logger.info(f"delete_reminder() called for ID {reminder_id}")
+    logger.info("delete_reminder() called for ID %s", reminder_id)
 
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
+    conn = get_connection()
+    with conn:
+        deleted = conn.execute("DELETE FROM reminders WHERE id = ?", (reminder_id,)).rowcount > 0
 
-    c.execute("DELETE FROM reminders WHERE id = ?", (reminder_id,))
+    logger.debug("Reminder %s deleted: %s", reminder_id, deleted)
+    return deleted
 
-    deleted = c.rowcount > 0
-    conn.commit()
-    conn.close()
 
-    logger.debug(f"Reminder {reminder_id} deleted: {deleted}")
-    return deleted
+# =============================================================================
+# DAILY SUMMARY FUNCTIONS
+# =============================================================================
+
+def get_cached_summary(key: str) -> str | None:
+    """Get a previously generated daily summary by its key."""
+    logger.debug("get_cached_summary() called for key %s", key)
+
+    conn = get_connection()
+    row = conn.execute("SELECT summary FROM daily_summaries WHERE key = ?", (key,)).fetchone()
+
+    return row[0] if row else None
+
+
+def save_cached_summary(key: str, summary: str):
+    """Store a generated daily summary, dropping ones older than a week."""
+    logger.debug("save_cached_summary() called for key %s", key)
+
+    conn = get_connection()
+    c = conn.cursor()
+    c.execute("INSERT OR REPLACE INTO daily_summaries (key, summary) VALUES (?, ?)", (key, summary))
+    c.execute("DELETE FROM daily_summaries WHERE created_at < datetime('now', '-7 days')")
+    conn.commit()
 
 
 # Initialize DB on import